@@ -0,0 +1,29 @@
+"""add average price
+
+Revision ID: a41f7c2e9b10
+Revises: 5b3c31955cb2
+Create Date: 2024-04-08 18:21:44.503217
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a41f7c2e9b10"
+down_revision: Union[str, None] = "5b3c31955cb2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("avg_price_units", sa.BigInteger()))
+    op.add_column("orders", sa.Column("avg_price_nanos", sa.BigInteger()))
+
+
+def downgrade() -> None:
+    op.drop_column("orders", "avg_price_nanos")
+    op.drop_column("orders", "avg_price_units")
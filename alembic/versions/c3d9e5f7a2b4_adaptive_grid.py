@@ -0,0 +1,29 @@
+"""adaptive grid
+
+Revision ID: c3d9e5f7a2b4
+Revises: a41f7c2e9b10
+Create Date: 2024-04-15 12:07:41.218954
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c3d9e5f7a2b4"
+down_revision: Union[str, None] = "a41f7c2e9b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("share_strategy", sa.Column("adaptive", sa.Boolean(), default=False))
+    op.add_column("share_strategy", sa.Column("max_live_orders", sa.Integer()))
+    op.execute("UPDATE share_strategy SET adaptive = false")
+
+
+def downgrade() -> None:
+    op.drop_column("share_strategy", "max_live_orders")
+    op.drop_column("share_strategy", "adaptive")
@@ -1,7 +1,8 @@
 import json
-import sys
 from typing import Dict
 import asyncio
+import datetime
+import signal
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums.parse_mode import ParseMode
@@ -11,10 +12,23 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from loguru import logger
 from tinkoff.invest import AsyncClient
 from trading.client import get_client
-from trading.strategies import tick
+from trading.commands import handle_command
+from trading.errors import load_error_data
+from trading.indicators import update_indicators
+from trading.metrics import start_metrics_server
+from trading.reference import reference_prices
+from trading.sharding import shard
+from trading import snapshot
+from trading.leader import leadership
+from trading.strategies import take_over, tick
+from trading.watchdog import monitor
 
 from bot import prepare
+from bot.notifications import Outbox
+from bus import COMMANDS, NOTIFICATIONS, bus
+from logs import setup_logging
 from config import Config
+from db import Connection
 
 config = Config()  # type: ignore
 
@@ -29,38 +43,129 @@ redis_storage = RedisStorage(
 dp = Dispatcher(storage=redis_storage)
 dp = prepare(dp)
 
-logger.remove()  # remove default logger
-logger.add(sys.stdout, level="INFO", format="{level} | {message}", colorize=True)
-# logger.add("logs/bot.log", level="DEBUG", format="{time} | {level} | {message}")
+setup_logging()
 
 
-async def main() -> None:
-    logger.info("Starting bot...")
-    bot = Bot(
-        token=config.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-    )
-    botname = (await bot.me()).username
-    bot_url = f"https://t.me/{botname}"
-    logger.info(f"Bot url: {bot_url}")
-    for admin in config.ADMIN_IDS:
-        logger.info(f"Admin id: {admin}")
+async def run_engine() -> None:
+    if config.LEADER_ELECTION and config.SHARDING:
+        raise ValueError("LEADER_ELECTION and SHARDING can't be used together")
+    logger.info("Starting trading engine...")
+    # the account, instruments, calendar and indicators of the last run,
+    # updated from the broker and Postgres as they go stale
+    snapshot.restore()
     async with get_client() as client:
         logger.info(f"Client balance: {await client.get_balance()}")
         for pos in await client.get_positions():
             logger.info(f"Position: {pos}")
+    with Connection() as db:
+        reference_prices.load(db)
 
     scheduler = AsyncIOScheduler()
+    # sessions, holidays and clearing breaks are checked inside the tick
     scheduler.add_job(
         tick,
         "cron",
+        id="tick",
+        minute="*",
+        timezone="Europe/Moscow",
+    )
+    scheduler.add_job(
+        update_indicators,
+        "cron",
         day_of_week="mon-fri",
         hour="10-23",
-        minute="*",
+        minute="*/5",
         timezone="Europe/Moscow",
     )
+    scheduler.add_job(
+        snapshot.save,
+        "interval",
+        minutes=config.SNAPSHOT_INTERVAL,
+    )
     scheduler.start()
 
-    await dp.start_polling(bot)
+    try:
+        await serve_engine(scheduler)
+    finally:
+        scheduler.shutdown(wait=False)
+        await snapshot.save()
+        if config.LEADER_ELECTION:
+            await leadership.stop()
+        if config.SHARDING:
+            await shard.stop()
+
+
+async def serve_engine(scheduler: AsyncIOScheduler) -> None:
+    if config.LEADER_ELECTION:
+
+        async def on_elected():
+            await take_over()
+            # don't wait for the next minute
+            scheduler.modify_job("tick", next_run_time=datetime.datetime.now())
+
+        leadership.on_elected = on_elected
+        await leadership.start()
+
+    if config.SHARDING:
+        await shard.start()
+    if config.SHARDING or config.LEADER_ELECTION:
+        # every engine keeps its own ledger, so each one gets all commands
+        await bus.subscribe(COMMANDS, handle_command)
+    else:
+        await bus.consume(COMMANDS, "engine", handle_command)
+
+
+async def run_bot() -> None:
+    logger.info("Starting bot...")
+    bot = Bot(
+        token=config.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+    botname = (await bot.me()).username
+    bot_url = f"https://t.me/{botname}"
+    logger.info(f"Bot url: {bot_url}")
+    for admin in config.ADMIN_IDS:
+        logger.info(f"Admin id: {admin}")
+
+    # the outbox sends at the pace Telegram allows and acknowledges the
+    # stream entries once they are delivered
+    outbox = Outbox(bot, lambda ids: bus.ack(NOTIFICATIONS, "bot", *ids))
+    sender = asyncio.create_task(outbox.run())
+    notifications = asyncio.create_task(
+        bus.consume(NOTIFICATIONS, "bot", outbox.notify_admins, deferred=True)
+    )
+    try:
+        await dp.start_polling(bot)
+    finally:
+        notifications.cancel()
+        sender.cancel()
+
+
+async def main() -> None:
+    monitor.start()
+    load_error_data()
+    if config.METRICS_PORT:
+        start_metrics_server(config.METRICS_PORT)
+    # the engine and the bot talk over Redis streams, so they can run
+    # in one process or in separate ones
+    runners = []
+    if config.APP_MODE in ("all", "engine"):
+        runners.append(asyncio.create_task(run_engine()))
+    if config.APP_MODE in ("all", "bot"):
+        runners.append(asyncio.create_task(run_bot()))
+    # a graceful stop lets the engine save its snapshot and resign;
+    # aiogram installs its own handlers while polling
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: [r.cancel() for r in runners])
+    try:
+        done, _ = await asyncio.wait(runners, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for runner in runners:
+            runner.cancel()
+        await asyncio.gather(*runners, return_exceptions=True)
+    for runner in done:
+        if not runner.cancelled():
+            runner.result()
 
 
 if __name__ == "__main__":
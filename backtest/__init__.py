@@ -0,0 +1,9 @@
+from .data import Candles, load, load_csv, load_npz, save_npz
+from .engine import (
+    Backtest,
+    BacktestResult,
+    FillModel,
+    StrategyParams,
+    run_backtest,
+)
+from .sweep import SweepGrid, apply_best, rank, sweep
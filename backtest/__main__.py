@@ -0,0 +1,84 @@
+import argparse
+import json
+import time
+
+from loguru import logger
+
+from .data import load
+from .engine import FillModel, StrategyParams, run_backtest
+
+
+def get_params(args: argparse.Namespace) -> list[StrategyParams]:
+    if not args.from_db:
+        if args.ticker is None or args.capital is None:
+            raise ValueError("--ticker and --capital are required without --from-db")
+        return [
+            StrategyParams(
+                ticker=args.ticker,
+                max_capital=args.capital,
+                step_trigger=args.trigger,
+                step_amount=args.amount,
+                lot=args.lot,
+                min_price_increment=args.increment,
+                adaptive=args.adaptive,
+                max_live_orders=args.max_live_orders,
+            )
+        ]
+
+    from db import Connection
+    from db.strategies import get_share_strategies
+
+    with Connection() as db:
+        strategies = get_share_strategies(db, 1, args.ticker)
+        return [
+            StrategyParams.from_share_strategy(s, args.lot, args.increment)
+            for s in strategies
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m backtest", description="Replay candles through strategy 1"
+    )
+    parser.add_argument(
+        "candles",
+        help="CSV, .npz or store:TICKER/INTERVAL, {ticker} is replaced per strategy",
+    )
+    parser.add_argument("--from-db", action="store_true", help="use ShareStrategy rows")
+    parser.add_argument("--ticker")
+    parser.add_argument("--capital", type=float)
+    parser.add_argument("--trigger", type=float, default=1.0, help="step, percent")
+    parser.add_argument("--amount", type=int, default=1, help="shares per order")
+    parser.add_argument("--lot", type=int, default=1)
+    parser.add_argument("--increment", type=float, default=0.01)
+    parser.add_argument("--adaptive", action="store_true", help="ATR sized zones")
+    parser.add_argument("--max-live-orders", type=int, default=0)
+    parser.add_argument("--commission", type=float, default=0.0)
+    parser.add_argument(
+        "--through", action="store_true", help="fill only when price trades through"
+    )
+    parser.add_argument("--replan", type=int, default=15, help="bars between plans")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    fill_model = FillModel(on_touch=not args.through, commission=args.commission)
+    results = []
+    for params in get_params(args):
+        candles = load(args.candles.format(ticker=params.ticker))
+        started = time.perf_counter()
+        result = run_backtest(params, candles, fill_model, args.replan)
+        elapsed = time.perf_counter() - started
+        logger.info(f"{params.ticker}: {len(candles)} bars replayed in {elapsed:.2f}s")
+        summary = result.summary()
+        results.append(summary)
+        for name, value in summary.items():
+            print(f"{name:<16} {value}")
+        print()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import csv
+import datetime
+
+import numpy as np
+
+from history.candles import COLUMNS, Candles
+
+
+def _parse_time(value: str) -> int:
+    if value.lstrip("-").isdigit():
+        return int(value)
+    time = datetime.datetime.fromisoformat(value)
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=datetime.timezone.utc)
+    return int(time.timestamp())
+
+
+def load_csv(path: str) -> Candles:
+    """Read ``time,open,high,low,close[,volume]`` rows (ISO or epoch time)."""
+    with open(path, newline="", encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    if not rows:
+        raise ValueError(f"No candles in {path}")
+    return Candles.from_arrays(
+        time=[_parse_time(row["time"]) for row in rows],
+        open=[float(row["open"]) for row in rows],
+        high=[float(row["high"]) for row in rows],
+        low=[float(row["low"]) for row in rows],
+        close=[float(row["close"]) for row in rows],
+        volume=[int(float(row.get("volume") or 0)) for row in rows],
+    )
+
+
+def load_npz(path: str) -> Candles:
+    with np.load(path) as data:
+        return Candles(*(data[name] for name in COLUMNS))
+
+
+def save_npz(path: str, candles: Candles) -> None:
+    np.savez(path, **{name: getattr(candles, name) for name in COLUMNS})
+
+
+def load(path: str) -> Candles:
+    """A CSV or .npz file, or ``store:TICKER[/INTERVAL]`` for the candle store."""
+    if path.startswith("store:"):
+        from history import store
+
+        ticker, _, interval = path.removeprefix("store:").partition("/")
+        return store.read(ticker, interval or "1min")
+    if path.endswith(".npz"):
+        return load_npz(path)
+    return load_csv(path)
@@ -0,0 +1,330 @@
+import datetime
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from trading.grid import (
+    Occupancy,
+    buy_limit,
+    free_zones,
+    get_adaptive_step,
+    get_step,
+)
+from trading.indicators import ATR
+from trading.orders import Direction
+from trading.price import NANO, Price
+from .data import Candles
+
+DAY = 24 * 60 * 60
+DAY_OFFSET = 60 * 60  # reference prices expire at 01:00 UTC
+NO_SELL = np.iinfo(np.int64).max
+
+
+@dataclass
+class StrategyParams:
+    ticker: str
+    max_capital: float
+    step_trigger: float  # percent
+    step_amount: int  # shares per order
+    lot: int = 1
+    min_price_increment: float = 0.01
+    adaptive: bool = False
+    max_live_orders: int = 0  # 0 for no limit
+
+    @classmethod
+    def from_share_strategy(
+        cls, strategy, lot: int = 1, min_price_increment: float = 0.01
+    ) -> "StrategyParams":
+        return cls(
+            ticker=str(strategy.ticker),
+            max_capital=float(strategy.max_capital),
+            step_trigger=float(strategy.step_trigger),
+            step_amount=int(strategy.step_amount),
+            lot=lot,
+            min_price_increment=min_price_increment,
+            adaptive=bool(strategy.adaptive),
+            max_live_orders=int(strategy.max_live_orders or 0),
+        )
+
+
+@dataclass
+class FillModel:
+    """How a resting limit order is filled by a bar.
+
+    A buy fills when the bar low reaches its price, a sell when the bar high
+    does. Gaps through the price fill at the bar open.
+    """
+
+    on_touch: bool = True  # False requires the price to trade through
+    commission: float = 0.0  # fraction of the fill notional
+
+
+@dataclass
+class BacktestResult:
+    ticker: str
+    start: datetime.datetime
+    end: datetime.datetime
+    bars: int
+    buys: int
+    sells: int
+    pnl: float
+    turnover: float
+    utilisation: float  # mean share of equity held in the instrument
+    max_drawdown: float  # fraction of the equity peak
+    final_position: int
+    final_cash: float
+    commission: float
+    equity: np.ndarray = field(repr=False)
+
+    @property
+    def trades(self) -> int:
+        return self.buys + self.sells
+
+    def summary(self) -> dict:
+        return {
+            "ticker": self.ticker,
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "bars": self.bars,
+            "buys": self.buys,
+            "sells": self.sells,
+            "pnl": round(self.pnl, 2),
+            "turnover": round(self.turnover, 2),
+            "utilisation": round(self.utilisation, 4),
+            "max_drawdown": round(self.max_drawdown, 4),
+            "final_position": self.final_position,
+            "final_cash": round(self.final_cash, 2),
+            "commission": round(self.commission, 2),
+        }
+
+
+class Backtest:
+    """Replays candles through the ``strategy1`` grid for one ``ShareStrategy``.
+
+    The grid is planned with the same ``trading.grid`` code the live strategy
+    uses. Bars between plans are scanned with numpy until one crosses the best
+    open buy or sell, so quiet stretches cost a handful of array operations.
+    """
+
+    def __init__(
+        self,
+        params: StrategyParams,
+        candles: Candles,
+        fill_model: FillModel | None = None,
+        replan_every: int = 15,
+    ) -> None:
+        if len(candles) == 0:
+            raise ValueError("No candles to replay")
+        if params.step_amount <= 0 or params.step_amount % params.lot:
+            raise ValueError(
+                f"Invalid step amount: {params.step_amount} with lot {params.lot}"
+            )
+        self.params = params
+        self.candles = candles
+        self.fill_model = fill_model or FillModel()
+        self.replan_every = max(replan_every, 1)
+
+        self.step = get_step(params.step_trigger)
+        self.increment = Price.from_float(params.min_price_increment)
+        self.days = (candles.time - DAY_OFFSET) // DAY
+        self.day_breaks = np.flatnonzero(np.diff(self.days)) + 1
+        # the same cap as strategy1, so sweeps match live trading
+        self.max_live = params.max_live_orders
+        self.buys_cap = buy_limit(params.max_live_orders)
+        self.atr: list[float | None] = []
+        if params.adaptive:
+            atr = ATR()
+            self.atr = [
+                atr.update(high, low, close)
+                for high, low, close in zip(
+                    (candles.high / NANO).tolist(),
+                    (candles.low / NANO).tolist(),
+                    (candles.close / NANO).tolist(),
+                )
+            ]
+
+        self.cash = Price.from_float(params.max_capital).value
+        self.free = self.cash
+        self.position = 0
+        self.buys: list[int] = []  # open buy prices, ascending
+        self.sells: list[int] = []  # open sell prices, ascending
+        self.occupancy = Occupancy()
+        self.anchor: tuple[int, int] | None = None  # (price, day)
+
+        self.buy_count = 0
+        self.sell_count = 0
+        self.turnover = 0
+        self.commission = 0
+        self.changes: list[tuple[int, int, int]] = []  # (bar, cash, position)
+
+    def run(self) -> BacktestResult:
+        candles = self.candles
+        n = len(candles)
+        self._warmup(0)
+        self._plan(0)
+        i = 0
+        while i < n - 1:
+            stop = min(i + self.replan_every, n - 1)
+            k = bisect_right(self.day_breaks, i)  # type: ignore
+            if k < len(self.day_breaks):
+                stop = min(stop, int(self.day_breaks[k]))
+            j = self._scan(i + 1, stop + 1)
+            if j < 0:
+                j = stop
+            else:
+                self._fill(j)
+            self._plan(j)
+            i = j
+        return self._result()
+
+    def _warmup(self, i: int) -> None:
+        params = self.params
+        price = int(self.candles.open[i])
+        shares = int(Price.from_float(params.max_capital / 2).value // price)
+        shares -= shares % params.lot
+        if shares == 0:
+            raise ValueError(f"Not enough capital to buy {params.ticker}")
+        self._trade(i, Direction.BUY, shares, price)
+        self.free = max(Price.from_float(params.max_capital).value - price * shares, 0)
+
+    def _scan(self, start: int, stop: int) -> int:
+        """First bar in ``[start, stop)`` that fills an open order, or -1."""
+        buy_max = self.buys[-1] if self.buys else -1
+        sell_min = self.sells[0] if self.sells else NO_SELL
+        if not self.fill_model.on_touch:
+            buy_max -= 1
+            sell_min += 1
+        low, high = self.candles.low, self.candles.high
+        size = 64
+        while start < stop:
+            end = min(start + size, stop)
+            hit = (low[start:end] <= buy_max) | (high[start:end] >= sell_min)
+            k = int(hit.argmax())
+            if hit[k]:
+                return start + k
+            start = end
+            size *= 2
+        return -1
+
+    def _fill(self, j: int) -> None:
+        candles = self.candles
+        bar_open = int(candles.open[j])
+        low, high = int(candles.low[j]), int(candles.high[j])
+        close = int(candles.close[j])
+        touch = 0 if self.fill_model.on_touch else 1
+        amount = self.params.step_amount
+        filled: list[int] = []
+
+        k = bisect_left(self.buys, low + touch)
+        for price in self.buys[k:]:
+            fill_price = min(price, bar_open)
+            self._trade(j, Direction.BUY, amount, fill_price)
+            self.occupancy.remove(Price(price))
+            filled.append(fill_price)
+        del self.buys[k:]
+
+        k = bisect_right(self.sells, high - touch)
+        for price in self.sells[:k]:
+            fill_price = max(price, bar_open)
+            self._trade(j, Direction.SELL, amount, fill_price)
+            self.free += price * amount
+            self.occupancy.remove(Price(price))
+            filled.append(fill_price)
+        del self.sells[:k]
+
+        if filled:
+            # the last print of the bar is the fill closest to its close
+            anchor = min(filled, key=lambda p: abs(p - close))
+            self.anchor = (anchor, int(self.days[j]))
+
+    def _trade(self, i: int, direction: Direction, shares: int, price: int) -> None:
+        notional = price * shares
+        fee = int(notional * self.fill_model.commission)
+        if direction == Direction.BUY:
+            self.cash -= notional + fee
+            self.position += shares
+            self.buy_count += 1
+        else:
+            self.cash += notional - fee
+            self.position -= shares
+            self.sell_count += 1
+        self.turnover += notional
+        self.commission += fee
+        self.changes.append((i, self.cash, self.position))
+
+    def _plan(self, i: int) -> None:
+        current = Price(int(self.candles.close[i]))
+        anchor = current
+        if self.anchor is not None and self.anchor[1] == self.days[i]:
+            anchor = Price(self.anchor[0])
+        amount = self.params.step_amount
+        step = self.step
+        if self.params.adaptive:
+            step = get_adaptive_step(step, self.atr[i], current.amount)
+
+        for price in free_zones(anchor, step, current, Direction.BUY, self.occupancy):
+            if self.free <= 0:
+                break
+            if self.max_live and len(self.buys) >= self.buys_cap:
+                break
+            price = price.round_to(self.increment)
+            if price.value * amount > self.free:
+                break
+            self.free -= price.value * amount
+            insort(self.buys, price.value)
+            self.occupancy.add(price)
+
+        free_shares = self.position - len(self.sells) * amount
+        for price in free_zones(anchor, step, current, Direction.SELL, self.occupancy):
+            if free_shares < amount:
+                break
+            if self.max_live and len(self.buys) + len(self.sells) >= self.max_live:
+                break
+            price = price.round_to(self.increment)
+            insort(self.sells, price.value)
+            self.occupancy.add(price)
+            free_shares -= amount
+
+    def _result(self) -> BacktestResult:
+        candles = self.candles
+        n = len(candles)
+        bars = np.array([c[0] for c in self.changes], dtype=np.int64)
+        cash = np.array([c[1] for c in self.changes], dtype=np.float64) / NANO
+        position = np.array([c[2] for c in self.changes], dtype=np.float64)
+        # state in effect at every bar, changes apply from their bar onwards
+        state = np.searchsorted(bars, np.arange(n), side="right") - 1
+        close = candles.close.astype(np.float64) / NANO
+        held = position[state] * close
+        equity = cash[state] + held
+
+        peak = np.maximum.accumulate(equity)
+        drawdown = float(((peak - equity) / peak).max()) if n else 0.0
+        utilisation = float(
+            np.mean(np.divide(held, equity, out=np.zeros(n), where=equity > 0))
+        )
+        return BacktestResult(
+            ticker=self.params.ticker,
+            start=candles.start(),
+            end=candles.end(),
+            bars=n,
+            buys=self.buy_count,
+            sells=self.sell_count,
+            pnl=float(equity[-1] - self.params.max_capital),
+            turnover=self.turnover / NANO,
+            utilisation=utilisation,
+            max_drawdown=drawdown,
+            final_position=self.position,
+            final_cash=self.cash / NANO,
+            commission=self.commission / NANO,
+            equity=equity,
+        )
+
+
+def run_backtest(
+    params: StrategyParams,
+    candles: Candles,
+    fill_model: FillModel | None = None,
+    replan_every: int = 15,
+) -> BacktestResult:
+    return Backtest(params, candles, fill_model, replan_every).run()
@@ -0,0 +1,286 @@
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from loguru import logger
+
+from .data import COLUMNS, Candles
+from .engine import FillModel, StrategyParams, run_backtest
+
+RANKINGS = {
+    "return": lambda row: row["return"],
+    "pnl": lambda row: row["pnl"],
+    "calmar": lambda row: row["return"] / max(row["max_drawdown"], 1e-9),
+}
+FIELDS = [
+    "ticker",
+    "rank",
+    "max_capital",
+    "step_trigger",
+    "step_amount",
+    "return",
+    "pnl",
+    "turnover",
+    "utilisation",
+    "max_drawdown",
+    "buys",
+    "sells",
+    "commission",
+]
+
+
+@dataclass
+class SweepGrid:
+    step_triggers: list[float]
+    step_amounts: list[int]
+    max_capitals: list[float]
+
+    def combinations(self) -> list[tuple[float, int, float]]:
+        return list(
+            itertools.product(self.step_triggers, self.step_amounts, self.max_capitals)
+        )
+
+
+class SharedCandles:
+    """Candle columns of one ticker in a shared memory block."""
+
+    def __init__(self, candles: Candles) -> None:
+        self.length = len(candles)
+        size = len(COLUMNS) * self.length * 8
+        self.shm = SharedMemory(create=True, size=max(size, 1))
+        array = np.ndarray(
+            (len(COLUMNS), self.length), dtype=np.int64, buffer=self.shm.buf
+        )
+        for row, name in enumerate(COLUMNS):
+            array[row] = getattr(candles, name)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def release(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+    @staticmethod
+    def attach(name: str, length: int) -> tuple[SharedMemory, Candles]:
+        shm = SharedMemory(name=name)
+        array = np.ndarray((len(COLUMNS), length), dtype=np.int64, buffer=shm.buf)
+        return shm, Candles(*array)
+
+
+# blocks attached by this worker process, kept open between tasks
+_attached: dict[str, tuple[SharedMemory, Candles]] = {}
+
+
+def _run(task: tuple) -> dict | None:
+    name, length, params, fill_model, replan_every = task
+    if name not in _attached:
+        _attached[name] = SharedCandles.attach(name, length)
+    candles = _attached[name][1]
+    try:
+        result = run_backtest(params, candles, fill_model, replan_every)
+    except ValueError as e:
+        logger.debug(f"Skipped {params}: {e}")
+        return None
+    summary = result.summary()
+    summary.update(
+        max_capital=params.max_capital,
+        step_trigger=params.step_trigger,
+        step_amount=params.step_amount,
+        **{"return": round(result.pnl / params.max_capital, 6)},
+    )
+    return summary
+
+
+def rank(rows: list[dict], by: str = "return") -> list[dict]:
+    key = RANKINGS[by]
+    ranked: list[dict] = []
+    for _, group in itertools.groupby(
+        sorted(rows, key=lambda row: row["ticker"]), key=lambda row: row["ticker"]
+    ):
+        for i, row in enumerate(sorted(group, key=key, reverse=True), start=1):
+            row["rank"] = i
+            ranked.append(row)
+    return ranked
+
+
+def sweep(
+    candles: dict[str, Candles],
+    grid: SweepGrid,
+    lots: dict[str, int] | None = None,
+    increments: dict[str, float] | None = None,
+    fill_model: FillModel | None = None,
+    replan_every: int = 15,
+    workers: int | None = None,
+    rank_by: str = "return",
+) -> list[dict]:
+    """Backtest every grid combination for every ticker on all cores.
+
+    History is copied once into shared memory and attached by the workers,
+    tasks only carry the block name and the parameters.
+    """
+    if rank_by not in RANKINGS:
+        raise ValueError(f"Unknown ranking: {rank_by}")
+    lots = lots or {}
+    increments = increments or {}
+    fill_model = fill_model or FillModel()
+    shared = {ticker: SharedCandles(c) for ticker, c in candles.items()}
+    try:
+        tasks = [
+            (
+                shared[ticker].name,
+                shared[ticker].length,
+                StrategyParams(
+                    ticker=ticker,
+                    max_capital=capital,
+                    step_trigger=trigger,
+                    step_amount=amount,
+                    lot=lots.get(ticker, 1),
+                    min_price_increment=increments.get(ticker, 0.01),
+                ),
+                fill_model,
+                replan_every,
+            )
+            for ticker in candles
+            for trigger, amount, capital in grid.combinations()
+        ]
+        workers = workers or os.cpu_count() or 1
+        logger.info(f"Sweeping {len(tasks)} combinations on {workers} workers")
+        chunksize = max(len(tasks) // (workers * 4), 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = [r for r in pool.map(_run, tasks, chunksize=chunksize) if r]
+    finally:
+        for block in shared.values():
+            block.release()
+    return rank(rows, rank_by)
+
+
+def write_csv(path: str, rows: list[dict]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_csv(path: str) -> list[dict]:
+    with open(path, newline="", encoding="utf-8") as file:
+        return list(csv.DictReader(file))
+
+
+def apply_best(rows: list[dict], strategy: int = 1) -> list[str]:
+    """Write the top ranked parameters into existing ``ShareStrategy`` rows.
+
+    ``max_capital`` is only changed before warmup, the ledger of a running
+    strategy is built from it.
+    """
+    from db import Connection
+    from db.strategies import get_share_strategies, update_share_strategy
+
+    best = {row["ticker"]: row for row in rows if int(row["rank"]) == 1}
+    applied: list[str] = []
+    with Connection() as db:
+        for share_strategy in get_share_strategies(db, strategy, tickers=list(best)):
+            ticker = str(share_strategy.ticker)
+            row = best[ticker]
+            update_share_strategy(
+                db,
+                strategy,
+                ticker,
+                max_capital=(
+                    None
+                    if bool(share_strategy.warmed_up)
+                    else float(row["max_capital"])
+                ),
+                step_trigger=float(row["step_trigger"]),
+                step_amount=int(row["step_amount"]),
+                need_reset=True,
+            )
+            applied.append(ticker)
+            logger.info(
+                f"Applied sweep result for {ticker}: "
+                f"step_trigger={row['step_trigger']}, step_amount={row['step_amount']}"
+            )
+    return applied
+
+
+def parse_values(text: str, type_=float) -> list:
+    """``"0.5,1,2"`` or an inclusive range ``"0.5:3:0.5"``."""
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        values = np.arange(start, stop + step / 2, step)
+        return [type_(round(float(v), 6)) for v in values]
+    return [type_(v) for v in text.split(",") if v]
+
+
+def parse_mapping(items: list[str], type_=float) -> dict:
+    mapping = {}
+    for item in items:
+        ticker, _, value = item.partition("=")
+        mapping[ticker] = type_(value)
+    return mapping
+
+
+def main() -> None:
+    import argparse
+
+    from .data import load
+
+    parser = argparse.ArgumentParser(
+        prog="python -m backtest.sweep",
+        description="Rank strategy 1 parameters on historical candles",
+    )
+    parser.add_argument("candles", help="CSV or .npz file, {ticker} is replaced")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--triggers", default="0.5:3:0.5", help="percent")
+    parser.add_argument("--amounts", default="1", help="shares per order")
+    parser.add_argument("--capitals", default="100000")
+    parser.add_argument("--lot", action="append", default=[], help="TICKER=LOT")
+    parser.add_argument(
+        "--increment", action="append", default=[], help="TICKER=INCREMENT"
+    )
+    parser.add_argument("--commission", type=float, default=0.0)
+    parser.add_argument("--replan", type=int, default=15)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--rank-by", choices=list(RANKINGS), default="return")
+    parser.add_argument("--output", default="sweep.csv")
+    parser.add_argument(
+        "--apply", action="store_true", help="write the best rows to ShareStrategy"
+    )
+    args = parser.parse_args()
+
+    grid = SweepGrid(
+        step_triggers=parse_values(args.triggers),
+        step_amounts=parse_values(args.amounts, int),
+        max_capitals=parse_values(args.capitals),
+    )
+    candles = {t: load(args.candles.format(ticker=t)) for t in args.tickers}
+    rows = sweep(
+        candles,
+        grid,
+        lots=parse_mapping(args.lot, int),
+        increments=parse_mapping(args.increment),
+        fill_model=FillModel(commission=args.commission),
+        replan_every=args.replan,
+        workers=args.workers,
+        rank_by=args.rank_by,
+    )
+    write_csv(args.output, rows)
+    logger.info(f"Wrote {len(rows)} results to {args.output}")
+    for row in rows:
+        if row["rank"] == 1:
+            print(
+                f"{row['ticker']}: step_trigger={row['step_trigger']} "
+                f"step_amount={row['step_amount']} max_capital={row['max_capital']} "
+                f"return={row['return']:.2%} drawdown={row['max_drawdown']:.2%}"
+            )
+    if args.apply:
+        apply_best(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import timeit
+from fractions import Fraction
+
+from trading.orders import Quotation
+from trading.price import Price
+
+NUMBER = 100_000
+ZONES = 30
+
+
+def quotation_zones(price: Quotation, step: float) -> Quotation:
+    zone_size = price * step
+    total = Quotation(0)
+    for i in range(1, ZONES + 1):
+        zone_down = price - zone_size * i - zone_size * 0.1 - zone_size / 2
+        zone_up = price - zone_size * (i - 1) + zone_size * 0.1 - zone_size / 2
+        zone_down = Quotation(zone_down)
+        zone_up = Quotation(zone_up)
+        total = Quotation(zone_down + zone_up) / 2
+        if total < Quotation(price) * 0.8:
+            break
+    return total
+
+
+def price_zones(price: Price, step: Fraction) -> Price:
+    free_coef = Fraction(1, 10)
+    min_price = price * Fraction(8, 10)
+    zone_size = price * step
+    total = Price(0)
+    for i in range(1, ZONES + 1):
+        zone_down = price - zone_size * i - zone_size * free_coef - zone_size / 2
+        zone_up = price - zone_size * (i - 1) + zone_size * free_coef - zone_size / 2
+        total = (zone_down + zone_up) / 2
+        if total < min_price:
+            break
+    return total
+
+
+def bench(name: str, stmt, number: int = NUMBER) -> float:
+    best = min(timeit.repeat(stmt, number=number, repeat=5))
+    per_call = best / number * 1e9
+    print(f"{name:<40} {per_call:10.1f} ns/op")
+    return per_call
+
+
+def main():
+    q1, q2 = Quotation(245, 370_000_000), Quotation(12, 5_000_000)
+    p1, p2 = Price.from_units(245, 370_000_000), Price.from_units(12, 5_000_000)
+
+    results = [
+        (
+            "construct (units, nano)",
+            lambda: Quotation(245, 370_000_000),
+            lambda: Price.from_units(245, 370_000_000),
+        ),
+        ("add", lambda: q1 + q2, lambda: p1 + p2),
+        ("sub", lambda: q1 - q2, lambda: p1 - p2),
+        ("mul int", lambda: q1 * 7, lambda: p1 * 7),
+        ("div int", lambda: q1 / 3, lambda: p1 / 3),
+        ("compare", lambda: q1 < q2, lambda: p1 < p2),
+        ("amount", lambda: q1.amount, lambda: p1.amount),
+    ]
+    for name, old, new in results:
+        old_ns = bench(f"Quotation {name}", old)
+        new_ns = bench(f"Price {name}", new)
+        print(f"{'speedup':<40} {old_ns / new_ns:10.2f}x")
+
+    old_ns = bench(
+        f"Quotation zone loop ({ZONES} zones)",
+        lambda: quotation_zones(q1, 0.01),
+        number=NUMBER // 100,
+    )
+    new_ns = bench(
+        f"Price zone loop ({ZONES} zones)",
+        lambda: price_zones(p1, Fraction(1, 100)),
+        number=NUMBER // 100,
+    )
+    print(f"{'speedup':<40} {old_ns / new_ns:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
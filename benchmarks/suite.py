@@ -0,0 +1,327 @@
+"""Benchmarks of the trading hot paths against the simulator.
+
+    python -m benchmarks.suite [--db URL] [--output PATH] [--compare PATH]
+
+Orders go to the in-process simulated broker and the database is a
+throwaway SQLite file unless ``--db`` points to a scratch Postgres (its
+tables are dropped and recreated). Results are written as JSON named
+after the current commit, so runs of different commits can be compared.
+"""
+
+import os
+
+# the suite never talks to the real broker or to Telegram
+os.environ["BROKER"] = "simulator"
+os.environ["ADMIN_IDS"] = "[]"
+os.environ.setdefault("BOT_TOKEN", "1:benchmark")
+os.environ.setdefault("TINKOFF_TOKEN", "benchmark")
+os.environ.setdefault("ADMIN_USERNAMES", "[]")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379")
+os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+from dataclasses import asdict, dataclass
+from fractions import Fraction
+from typing import Awaitable, Callable
+
+from loguru import logger
+
+import db
+from db.models import base
+from db.strategies import add_share_strategy
+from trading.client import get_client
+from trading.grid import Occupancy, free_zones, get_zone
+from trading.ledger import ledger
+from trading.orders import Direction, Quotation
+from trading.price import Price
+from trading.reference import reference_prices
+from trading.simulator import InstrumentScenario, Scenario, reset_exchange
+from trading.strategies import tick
+
+NUMBER = 100_000
+REPEAT = 5
+ZONES = 30
+INSTRUMENTS = 100
+OPEN_ORDERS = (10, 100, 1000)
+STRATEGIES = (1, 10, 100)
+OUTPUT_DIR = "data/benchmarks"
+
+
+@dataclass
+class Result:
+    name: str
+    ops: int
+    seconds: float  # best of the repeats
+
+    @property
+    def per_op_us(self) -> float:
+        return self.seconds / self.ops * 1e6
+
+
+def bench(name: str, stmt: Callable, number: int = NUMBER) -> Result:
+    best = min(timeit.repeat(stmt, number=number, repeat=REPEAT))
+    return report(Result(name, number, best))
+
+
+async def abench(
+    name: str, call: Callable[[], Awaitable], ops: int = 1, repeat: int = 3
+) -> Result:
+    best = float("inf")
+    for _ in range(repeat):
+        started = timeit.default_timer()
+        await call()
+        best = min(best, timeit.default_timer() - started)
+    return report(Result(name, ops, best))
+
+
+def report(result: Result) -> Result:
+    print(f"{result.name:<45} {result.per_op_us:14.3f} us/op")
+    return result
+
+
+def scenario() -> Scenario:
+    return Scenario(
+        instruments=[
+            InstrumentScenario(
+                ticker=f"T{i:03d}",
+                figi=f"BENCH{i:07d}",
+                name=f"Benchmark {i}",
+                lot=10,
+                price=100.0 + i,
+            )
+            for i in range(INSTRUMENTS)
+        ],
+        cash=10_000_000_000,
+    )
+
+
+class World:
+    """Fresh exchange, database and process-wide caches for every case."""
+
+    def __init__(self, url: str) -> None:
+        self.engine = db.configure(url).kw["bind"]
+        self.scenario = scenario()
+
+    def reset(self) -> None:
+        base.metadata.drop_all(self.engine)
+        base.metadata.create_all(self.engine)
+        reset_exchange(self.scenario)
+        ledger.accounts.clear()
+        ledger.pending.clear()
+        reference_prices.prices.clear()
+        reference_prices.loaded = False
+
+    def drop(self) -> None:
+        base.metadata.drop_all(self.engine)
+        self.engine.dispose()
+
+
+def bench_quotation() -> list[Result]:
+    q1, q2 = Quotation(245, 370_000_000), Quotation(12, 5_000_000)
+    return [
+        bench("Quotation construct", lambda: Quotation(245, 370_000_000)),
+        bench("Quotation add", lambda: q1 + q2),
+        bench("Quotation sub", lambda: q1 - q2),
+        bench("Quotation mul", lambda: q1 * 7),
+        bench("Quotation div", lambda: q1 / 3),
+        bench("Quotation compare", lambda: q1 < q2),
+    ]
+
+
+def bench_price() -> list[Result]:
+    # the type the strategies and the client use since the Price rewrite
+    p1, p2 = Price.from_units(245, 370_000_000), Price.from_units(12, 5_000_000)
+    return [
+        bench("Price construct", lambda: Price.from_units(245, 370_000_000)),
+        bench("Price add", lambda: p1 + p2),
+        bench("Price sub", lambda: p1 - p2),
+        bench("Price mul", lambda: p1 * 7),
+        bench("Price div", lambda: p1 / 3),
+        bench("Price compare", lambda: p1 < p2),
+    ]
+
+
+def bench_zones() -> list[Result]:
+    price = Price.from_units(245, 370_000_000)
+    step = Fraction(1, 100)
+    # every other zone below the price is taken
+    occupancy = Occupancy(
+        ((get_zone(price, step, -i)[0] + get_zone(price, step, -i)[1]) / 2).value
+        for i in range(1, 200, 2)
+    )
+    down, up = get_zone(price, step, -7)
+
+    def zones():
+        for i in range(1, ZONES + 1):
+            get_zone(price, step, -i)
+
+    def ladder():
+        for _ in free_zones(price, step, price, Direction.BUY, occupancy):
+            pass
+
+    return [
+        bench(f"get_zone x{ZONES}", zones, NUMBER // 100),
+        bench(
+            f"Occupancy.occupied ({len(occupancy)} orders)",
+            lambda: occupancy.occupied(down, up),
+        ),
+        bench(
+            f"free_zones buy ladder ({len(occupancy)} orders)", ladder, NUMBER // 100
+        ),
+    ]
+
+
+async def place_orders(ticker: str, count: int) -> None:
+    async with get_client() as client:
+        share = await client.get_share_by_ticker(ticker)
+        if share is None:
+            raise ValueError(f"Share {ticker} not found")
+        increment = Price.from_quotation(share.min_price_increment)
+        # far below the market so that nothing fills
+        price = (await client.get_last_price(ticker)) / 2
+        for i in range(count):
+            await client.limit_buy(
+                ticker=ticker, lots=share.lot, price=price - increment * i
+            )
+
+
+async def bench_order(world: World, count: int = 100) -> list[Result]:
+    world.reset()
+    return [
+        await abench(
+            "InvestClient.order (limit)",
+            lambda: place_orders("T000", count),
+            ops=count,
+        )
+    ]
+
+
+async def bench_update_orders(world: World) -> list[Result]:
+    results = []
+    for count in OPEN_ORDERS:
+        world.reset()
+        await place_orders("T000", count)
+
+        async def update():
+            async with get_client() as client:
+                await client.update_orders()
+
+        results.append(await abench(f"update_orders ({count} open)", update))
+    return results
+
+
+async def bench_tick(world: World) -> list[Result]:
+    results = []
+    for count in STRATEGIES:
+        world.reset()
+        with db.Connection() as session:
+            for instrument in world.scenario.instruments[:count]:
+                add_share_strategy(
+                    session, 1, instrument.ticker, 100_000, 1, instrument.lot
+                )
+        results.append(await abench(f"tick cold ({count} strategies)", tick, repeat=1))
+        results.append(await abench(f"tick warm ({count} strategies)", tick))
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: list[Result], path: str, threshold: float = 0.1) -> None:
+    with open(path, encoding="utf-8") as file:
+        baseline = {r["name"]: r for r in json.load(file)["results"]}
+    print(f"\nCompared to {path}:")
+    for result in results:
+        old = baseline.get(result.name)
+        if old is None:
+            continue
+        ratio = result.seconds / result.ops / (old["seconds"] / old["ops"])
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "slower"
+        elif ratio < 1 - threshold:
+            mark = "faster"
+        print(f"{result.name:<45} {ratio:8.2f}x {mark}")
+
+
+async def run(url: str) -> list[Result]:
+    results = bench_quotation() + bench_price() + bench_zones()
+    world = World(url)
+    try:
+        results += await bench_order(world)
+        results += await bench_update_orders(world)
+        results += await bench_tick(world)
+    finally:
+        world.drop()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument(
+        "--db", help="scratch database url, a temporary SQLite file by default"
+    )
+    parser.add_argument(
+        "--output", help=f"result file, {OUTPUT_DIR}/<commit>.json by default"
+    )
+    parser.add_argument("--compare", help="earlier result file to compare with")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    directory = None
+    url = args.db
+    if url is None:
+        directory = tempfile.mkdtemp(prefix="benchmarks-")
+        url = f"sqlite:///{os.path.join(directory, 'benchmarks.db')}"
+    try:
+        results = asyncio.run(run(url))
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    commit = git_commit()
+    output = args.output or os.path.join(OUTPUT_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "commit": commit,
+                "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "database": url.split(":", 1)[0],
+                "results": [
+                    {**asdict(result), "per_op_us": result.per_op_us}
+                    for result in results
+                ],
+            },
+            file,
+            indent=2,
+        )
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
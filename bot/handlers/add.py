@@ -1,3 +1,5 @@
+from html import escape
+
 from aiogram import F, Router, types
 from aiogram.filters import Command, StateFilter
 from aiogram.filters import callback_data
@@ -7,16 +9,59 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from db import Connection
 from db.strategies import add_share_strategy, get_share_strategies
 
-from Levenshtein import distance
-
 from config import Config
 from trading import InvestClient, get_client
+from trading.instruments import catalog
 
 from ..filters import IsPrivate, Admin
 
 router = Router(name=__name__)
 config = Config()  # type: ignore
 
+SUGGESTIONS = 5
+PAGE_SIZE = 40  # shares per page, well under the message size limit
+
+
+class SharePages:
+    """The share list as message pages, rendered once per catalog version."""
+
+    def __init__(self, size: int = PAGE_SIZE) -> None:
+        self.size = size
+        self.version = ""
+        self.pages: list[str] = []
+
+    def get(self) -> list[str]:
+        if self.version != catalog.version:
+            lines = [
+                f"<code>{share.ticker}</code> - {escape(share.name)}. Lot: {share.lot}"
+                for share in sorted(catalog.shares, key=lambda share: share.ticker)
+            ]
+            chunks = [
+                lines[i : i + self.size] for i in range(0, len(lines), self.size)
+            ] or [[]]
+            self.pages = [
+                f"Акции, страница {i + 1} из {len(chunks)}:\n\n" + "\n".join(chunk)
+                for i, chunk in enumerate(chunks)
+            ]
+            self.version = catalog.version
+        return self.pages
+
+
+share_pages = SharePages()
+
+
+def page_keyboard(page: int, total: int) -> types.InlineKeyboardMarkup:
+    keyboard = InlineKeyboardBuilder()
+    if page > 0:
+        keyboard.add(
+            types.InlineKeyboardButton(text="◀", callback_data=f"shares:{page - 1}")
+        )
+    if page < total - 1:
+        keyboard.add(
+            types.InlineKeyboardButton(text="▶", callback_data=f"shares:{page + 1}")
+        )
+    return keyboard.as_markup()
+
 
 @router.message(Command("add"), IsPrivate(), Admin())
 async def new_srategy(message: Message, state: FSMContext):
@@ -42,13 +87,9 @@ async def new_srategy(message: Message, state: FSMContext):
 @router.callback_query(F.data == "shares")
 async def shares(call: CallbackQuery, state: FSMContext):
     async with get_client() as client:
-        shares = await client.get_shares()
-    msg = []
-    for share in shares:
-        msg.append(f"<code>{share.ticker}</code> - {share.name}. Lot: {share.lot}")
-    cnt = len(msg)
-    await call.message.answer("\n".join(msg[: cnt // 2]))
-    await call.message.answer("\n".join(msg[cnt // 2 :]))
+        await client.get_shares()  # fetched only once the catalog is stale
+    pages = share_pages.get()
+    await call.message.answer(pages[0], reply_markup=page_keyboard(0, len(pages)))
     if await state.get_state() == "add:share":
         last_message_id = (await state.get_data()).get("last_message_id")
         if last_message_id:
@@ -65,15 +106,58 @@ async def shares(call: CallbackQuery, state: FSMContext):
         await state.update_data(last_message_id=ans.message_id)
 
 
+@router.callback_query(F.data.startswith("shares:"))
+async def shares_page(call: CallbackQuery):
+    if not catalog.shares:  # the bot restarted since the list was sent
+        async with get_client() as client:
+            await client.get_shares()
+    # paging reads the cached pages, the list is refetched only by "shares"
+    pages = share_pages.get()
+    page = min(int(call.data.split(":")[1]), len(pages) - 1)
+    await call.message.edit_text(
+        pages[page], reply_markup=page_keyboard(page, len(pages))
+    )
+    await call.answer()
+
+
 @router.message(StateFilter("add:share"))
 async def share(message: Message, state: FSMContext):
-    share = message.text.upper()
+    query = message.text or ""
     async with get_client() as client:
-        shares = await client.get_shares()
-    shares = [share.ticker for share in shares]
-    shares.sort(key=lambda x: distance(x, share))
-    share = shares[0]
+        await client.get_shares()  # refreshes the catalog and its index
+    matches = catalog.search(query, SUGGESTIONS)
+    if matches and matches[0].ticker == query.strip().upper():
+        await choose_share(message, state, matches[0].ticker)
+        return
+
+    keyboard = InlineKeyboardBuilder()
+    for match in matches:
+        keyboard.add(
+            types.InlineKeyboardButton(
+                text=f"{match.ticker} - {match.name}",
+                callback_data=f"ticker:{match.ticker}",
+            )
+        )
+    keyboard.add(types.InlineKeyboardButton(text="Отмена", callback_data="cancel"))
+    keyboard.adjust(1)
+    last_message_id = (await state.get_data()).get("last_message_id")
+    if last_message_id:
+        await message.bot.edit_message_reply_markup(
+            message.chat.id, last_message_id, reply_markup=None
+        )
+
+    text = "Выберите тикер или введите другой:" if matches else "Тикер не найден"
+    ans = await message.answer(text, reply_markup=keyboard.as_markup())
+    await state.update_data(last_message_id=ans.message_id)
+
+
+@router.callback_query(F.data.startswith("ticker:"), StateFilter("add:share"))
+async def suggested_share(call: CallbackQuery, state: FSMContext):
+    await choose_share(call.message, state, call.data.split(":", 1)[1])
+    await call.answer()
+
 
+async def choose_share(message: Message, state: FSMContext, share: str):
     keyboard = InlineKeyboardBuilder()
     keyboard.add(
         types.InlineKeyboardButton(text="Стратегия 1", callback_data="strategy:1"),
@@ -6,6 +6,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from db import Connection
 from db.strategies import del_share_strategy, get_share_strategies
 
+from bus import bus
 from config import Config
 
 from ..filters import IsPrivate, Admin
@@ -105,6 +106,7 @@ async def confirm(call: CallbackQuery, state: FSMContext):
     strategy = data["strategy"]
     with Connection() as session:
         del_share_strategy(session, strategy, share)
+    await bus.command("forget", strategy=strategy, ticker=share)
     last_message_id = (await state.get_data()).get("last_message_id")
     if last_message_id:
         await call.message.bot.edit_message_reply_markup(
@@ -89,6 +89,9 @@ async def update_ticker(call: CallbackQuery, state: FSMContext):
     msg += f"Максимальный бюджет: {share_strategy[0].max_capital}\n"
     msg += f"Триггер: {share_strategy[0].step_trigger}%\n"
     msg += f"Количество акций: {share_strategy[0].step_amount}\n"
+    msg += f"Адаптивный шаг: {'да' if share_strategy[0].adaptive else 'нет'}\n"
+    if share_strategy[0].max_live_orders:
+        msg += f"Максимум активных заявок: {share_strategy[0].max_live_orders}\n"
 
     await call.message.answer(msg)
     await state.clear()
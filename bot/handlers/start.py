@@ -18,5 +18,6 @@ async def start(message: Message, state: FSMContext):
 /add - добавить стратегию
 /delete - удалить стратегию
 /update - обновить стратегию
-/info - посмотреть информацию о стратегиях"""
+/info - посмотреть информацию о стратегиях
+/adaptive - адаптивный шаг и лимит активных заявок"""
     )
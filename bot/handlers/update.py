@@ -1,5 +1,5 @@
 from aiogram import F, Router, types
-from aiogram.filters import Command, StateFilter
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.filters import callback_data
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, InputMediaPhoto, Message
@@ -191,6 +191,38 @@ async def confirm(call: CallbackQuery, state: FSMContext):
     await state.clear()
 
 
+@router.message(Command("adaptive"), IsPrivate(), Admin())
+async def adaptive(message: Message, command: CommandObject):
+    args = (command.args or "").split()
+    usage = "Использование: /adaptive ТИКЕР on|off [макс. заявок, 0 - без лимита]"
+    if len(args) not in (2, 3) or args[1].lower() not in ("on", "off"):
+        await message.answer(usage)
+        return
+    ticker = args[0].upper()
+    enabled = args[1].lower() == "on"
+    try:
+        max_live_orders = int(args[2]) if len(args) == 3 else None
+    except ValueError:
+        await message.answer(usage)
+        return
+    with Connection() as session:
+        if not get_share_strategies(session, 1, ticker):
+            await message.answer("Этот тикер не используется в этой стратегии")
+            return
+        update_share_strategy(
+            session,
+            1,
+            ticker,
+            need_reset=None,
+            adaptive=enabled,
+            max_live_orders=max_live_orders,
+        )
+    msg = f"Адаптивный шаг для {ticker}: {'включен' if enabled else 'выключен'}"
+    if max_live_orders is not None:
+        msg += f"\nМаксимум активных заявок: {max_live_orders or 'без лимита'}"
+    await message.answer(msg)
+
+
 @router.callback_query(F.data == "cancel")
 async def cancel(call: CallbackQuery, state: FSMContext):
     await call.message.answer("Отменено")
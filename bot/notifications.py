@@ -0,0 +1,160 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramForbiddenError,
+    TelegramBadRequest,
+    TelegramRetryAfter,
+)
+from loguru import logger
+
+from config import Config
+
+config = Config()  # type: ignore
+
+GLOBAL_PER_SECOND = 25  # Telegram allows about 30
+CHAT_INTERVAL = 1.0  # seconds between two messages to one chat
+DIGEST_AFTER = 3  # this many waiting messages of a chat are sent as one
+MAX_LENGTH = 4096
+MAX_ATTEMPTS = 5
+BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+
+class Outbox:
+    """Queued messages to the admins, sent by one background task.
+
+    Sends stay within Telegram's global and per-chat limits. A chat that
+    falls behind gets its waiting messages merged into digests. Failed
+    sends are retried with exponential backoff.
+
+    A stream entry is acknowledged through ``ack`` only once its message
+    was delivered to, or given up on for, every admin. Whatever is still
+    queued on a crash stays pending and is claimed again.
+    """
+
+    def __init__(
+        self, bot: Bot, ack: Callable[[list[str]], Awaitable] | None = None
+    ) -> None:
+        self.bot = bot
+        self.ack = ack
+        # chat -> [text, attempts, entry ids]
+        self.queues: dict[int, deque[list]] = {}
+        self.copies: dict[str, int] = {}  # entry id -> chats still to send
+        self.ready_at: dict[int, float] = {}
+        self.sent: deque[float] = deque()
+        self.wakeup = asyncio.Event()
+
+    def put(self, chat_id: int, text: str, entry_id: str | None = None) -> None:
+        ids = [entry_id] if entry_id is not None else []
+        self.queues.setdefault(chat_id, deque()).append([text[:MAX_LENGTH], 0, ids])
+        self.wakeup.set()
+
+    async def notify_admins(self, fields: dict[str, str], entry_id: str) -> None:
+        if entry_id in self.copies:
+            return  # claimed again while still queued
+        if not config.ADMIN_IDS:
+            await self.done([entry_id])
+            return
+        self.copies[entry_id] = len(config.ADMIN_IDS)
+        for admin in config.ADMIN_IDS:
+            self.put(admin, fields["text"], entry_id)
+
+    async def done(self, entry_ids: list[str]) -> None:
+        finished = []
+        for entry_id in entry_ids:
+            left = self.copies.pop(entry_id, 1) - 1
+            if left > 0:
+                self.copies[entry_id] = left
+            else:
+                finished.append(entry_id)
+        if finished and self.ack is not None:
+            try:
+                await self.ack(finished)
+            except Exception as e:
+                # delivered again after a restart at worst
+                logger.error(f"Acknowledging notifications failed: {e}")
+
+    def take(self, chat_id: int) -> list:
+        queue = self.queues[chat_id]
+        if len(queue) < DIGEST_AFTER:
+            return queue.popleft()
+        texts: list[str] = []
+        attempts = 0
+        ids: list[str] = []
+        length = 50  # the header
+        while queue and (not texts or length + len(queue[0][0]) + 2 <= MAX_LENGTH):
+            text, tried, entry_ids = queue.popleft()
+            texts.append(text)
+            attempts = max(attempts, tried)
+            ids += entry_ids
+            length += len(text) + 2
+        if len(texts) == 1:
+            return [texts[0], attempts, ids]
+        header = f"Сводка, уведомлений: {len(texts)}\n\n"
+        return [header + "\n\n".join(texts), attempts, ids]
+
+    async def wait_global_slot(self) -> None:
+        while True:
+            now = time.monotonic()
+            while self.sent and now - self.sent[0] >= 1:
+                self.sent.popleft()
+            if len(self.sent) < GLOBAL_PER_SECOND:
+                self.sent.append(now)
+                return
+            await asyncio.sleep(1 - (now - self.sent[0]))
+
+    async def send(self, chat_id: int) -> None:
+        item = self.take(chat_id)
+        text, attempts, ids = item
+        delay = CHAT_INTERVAL
+        finished = True
+        try:
+            # plain text, as the engine used to send it
+            await self.bot.send_message(chat_id, text, parse_mode=None)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            logger.error(f"Dropped notification to {chat_id}: {e}")
+        except Exception as e:
+            item[1] = attempts = attempts + 1
+            if isinstance(e, TelegramRetryAfter):
+                delay = float(e.retry_after)
+            else:
+                delay = min(BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF)
+            if attempts >= MAX_ATTEMPTS:
+                logger.error(
+                    f"Dropped notification to {chat_id} after {attempts} attempts: {e}"
+                )
+            else:
+                logger.warning(
+                    f"Notification to {chat_id} failed, retry in {delay}s: {e}"
+                )
+                self.queues[chat_id].appendleft(item)
+                finished = False
+        self.ready_at[chat_id] = time.monotonic() + delay
+        if finished:  # delivered or given up on
+            await self.done(ids)
+
+    async def run(self) -> None:
+        while True:
+            now = time.monotonic()
+            waiting = [chat for chat, queue in self.queues.items() if queue]
+            ready = [chat for chat in waiting if self.ready_at.get(chat, 0) <= now]
+            if not ready:
+                timeout = None
+                if waiting:
+                    timeout = min(self.ready_at[chat] for chat in waiting) - now
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            for chat in ready:
+                await self.wait_global_slot()
+                try:
+                    await self.send(chat)
+                except Exception as e:
+                    logger.error(f"Notification sender failed: {e}")
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import socket
+import time
+from typing import Awaitable, Callable
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from config import Config
+
+config = Config()  # type: ignore
+
+# engine -> bot: texts for the admins
+NOTIFICATIONS = "trading:notifications"
+# bot -> engine: changes the engine has to apply to its in-memory state
+COMMANDS = "trading:commands"
+
+MAXLEN = 10_000  # entries kept per stream
+BLOCK_MS = 5_000
+BATCH = 100
+CLAIM_IDLE_MS = 60_000  # pending this long, the consumer is considered gone
+
+Handler = Callable[[dict[str, str]], Awaitable]
+# takes over acknowledging the entry, through Bus.ack
+DeferredHandler = Callable[[dict[str, str], str], Awaitable]
+
+
+class Bus:
+    """Redis streams between the bot and the trading engine processes.
+
+    Every stream is read by one consumer group per side, so an entry is
+    handled once however many processes of that side run. Entries are
+    acknowledged after their handler succeeds, or by a deferred handler
+    once it is done with them. Entries left pending by a failed handler
+    or a dead process are claimed by a running consumer after
+    CLAIM_IDLE_MS, so a handler may see an entry again.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self.redis = redis
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+    async def publish(self, stream: str, **fields: str | int | float) -> str:
+        return await self.redis.xadd(
+            stream,
+            {key: str(value) for key, value in fields.items()},
+            maxlen=MAXLEN,
+            approximate=True,
+        )
+
+    async def notify(self, text: str) -> None:
+        await self.publish(NOTIFICATIONS, text=text)
+
+    async def command(self, name: str, **fields: str | int | float) -> None:
+        await self.publish(COMMANDS, command=name, **fields)
+
+    async def ensure_group(self, stream: str, group: str) -> None:
+        try:
+            # from the start of the stream, nothing sent before the first run is lost
+            await self.redis.xgroup_create(stream, group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def ack(self, stream: str, group: str, *entry_ids: str) -> None:
+        if entry_ids:
+            await self.redis.xack(stream, group, *entry_ids)
+
+    async def handle(
+        self,
+        stream: str,
+        group: str,
+        entries: list,
+        handler: Handler | DeferredHandler,
+        deferred: bool = False,
+    ) -> None:
+        for entry_id, fields in entries:
+            if fields is None:  # trimmed away while pending
+                await self.redis.xack(stream, group, entry_id)
+                continue
+            try:
+                if deferred:
+                    await handler(fields, entry_id)  # type: ignore
+                    continue
+                await handler(fields)  # type: ignore
+            except Exception as e:
+                logger.error(f"Handling {stream} entry {entry_id} failed: {e}")
+                continue
+            await self.redis.xack(stream, group, entry_id)
+
+    async def claim(
+        self,
+        stream: str,
+        group: str,
+        handler: Handler | DeferredHandler,
+        deferred: bool = False,
+    ) -> None:
+        """Take over the entries left unacknowledged for CLAIM_IDLE_MS."""
+        start = "0-0"
+        while True:
+            next_id, entries, *_ = await self.redis.xautoclaim(
+                stream, group, self.consumer, CLAIM_IDLE_MS, start_id=start, count=BATCH
+            )
+            await self.handle(stream, group, entries, handler, deferred)
+            if next_id == "0-0":
+                return
+            start = next_id
+
+    async def consume(
+        self,
+        stream: str,
+        group: str,
+        handler: Handler | DeferredHandler,
+        deferred: bool = False,
+    ) -> None:
+        await self.ensure_group(stream, group)
+        logger.info(f"Consuming {stream} as {group}/{self.consumer}")
+        next_claim = 0.0
+        while True:
+            if time.monotonic() >= next_claim:
+                # entries of dead consumers and of failed handlers
+                try:
+                    await self.claim(stream, group, handler, deferred)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Claiming {stream} entries failed: {e}")
+                next_claim = time.monotonic() + CLAIM_IDLE_MS / 1000
+            try:
+                response = await self.redis.xreadgroup(
+                    group, self.consumer, {stream: ">"}, count=BATCH, block=BLOCK_MS
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Reading {stream} failed: {e}")
+                await asyncio.sleep(BLOCK_MS / 1000)
+                continue
+            if response:
+                await self.handle(stream, group, response[0][1], handler, deferred)
+
+    async def subscribe(self, stream: str, handler: Handler) -> None:
+        """Every subscriber gets the entries added after it started.
+
+        Nothing is acknowledged, so a failed entry is logged and skipped.
+        """
+        latest = await self.redis.xrevrange(stream, count=1)
+        last = latest[0][0] if latest else "0-0"
+        logger.info(f"Subscribed to {stream} as {self.consumer}")
+        while True:
+            try:
+                response = await self.redis.xread(
+                    {stream: last}, count=BATCH, block=BLOCK_MS
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Reading {stream} failed: {e}")
+                await asyncio.sleep(BLOCK_MS / 1000)
+                continue
+            for entry_id, fields in response[0][1] if response else []:
+                last = entry_id
+                try:
+                    await handler(fields)
+                except Exception as e:
+                    logger.error(f"Handling {stream} entry {entry_id} failed: {e}")
+
+
+bus = Bus(Redis.from_url(str(config.redis_dns), decode_responses=True))
@@ -1,12 +1,66 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field, RedisDsn, PostgresDsn
-from typing import Set
+from typing import Literal, Set
 
 
 class Config(BaseSettings):
     BOT_TOKEN: str = Field(validation_alias="BOT_TOKEN")
     TINKOFF_TOKEN: str = Field(validation_alias="TINKOFF_TOKEN")
+    TINKOFF_ACCOUNT_ID: str | None = Field(
+        default=None, validation_alias="TINKOFF_ACCOUNT_ID"
+    )
     MOEX_WORKING_HOURS: range = range(10, 24)
+    TRADING_STATUS_TTL: float = Field(default=5, validation_alias="TRADING_STATUS_TTL")
+
+    APP_MODE: Literal["all", "bot", "engine"] = Field(
+        default="all", validation_alias="APP_MODE"
+    )
+
+    SHARDING: bool = Field(default=False, validation_alias="SHARDING")
+    SHARD_LEASE_SECONDS: float = Field(
+        default=30, validation_alias="SHARD_LEASE_SECONDS"
+    )
+
+    LEADER_ELECTION: bool = Field(default=False, validation_alias="LEADER_ELECTION")
+    LEADER_LEASE_SECONDS: float = Field(
+        default=15, validation_alias="LEADER_LEASE_SECONDS"
+    )
+
+    SNAPSHOT_PATH: str = Field(
+        default="data/snapshot.pkl", validation_alias="SNAPSHOT_PATH"
+    )
+    SNAPSHOT_INTERVAL: int = Field(default=5, validation_alias="SNAPSHOT_INTERVAL")
+    SNAPSHOT_MAX_AGE: float = Field(
+        default=24 * 60 * 60, validation_alias="SNAPSHOT_MAX_AGE"
+    )
+
+    BROKER: Literal["tinkoff", "simulator"] = Field(
+        default="tinkoff", validation_alias="BROKER"
+    )
+    SIMULATOR_SCENARIO: str | None = Field(
+        default=None, validation_alias="SIMULATOR_SCENARIO"
+    )
+
+    CANDLES_DIR: str = Field(default="data/candles", validation_alias="CANDLES_DIR")
+    CANDLES_HISTORY_DAYS: int = Field(
+        default=30, validation_alias="CANDLES_HISTORY_DAYS"
+    )
+
+    LOG_LEVEL: str = Field(default="INFO", validation_alias="LOG_LEVEL")
+    LOG_JSON: bool = Field(default=False, validation_alias="LOG_JSON")
+    LOG_SAMPLE_PER_MINUTE: int = Field(
+        default=20, validation_alias="LOG_SAMPLE_PER_MINUTE"
+    )
+
+    METRICS_PORT: int | None = Field(default=None, validation_alias="METRICS_PORT")
+    TRACE_DIR: str | None = Field(default=None, validation_alias="TRACE_DIR")
+    TRACE_MIN_SECONDS: float = Field(default=0, validation_alias="TRACE_MIN_SECONDS")
+    LOOP_MONITOR_INTERVAL: float = Field(
+        default=0.5, validation_alias="LOOP_MONITOR_INTERVAL"
+    )
+    LOOP_BLOCK_THRESHOLD: float = Field(
+        default=1.0, validation_alias="LOOP_BLOCK_THRESHOLD"
+    )
 
     ADMIN_IDS: Set[int] = Field(validation_alias="ADMIN_IDS")
     ADMIN_USERNAMES: Set[str] = Field(validation_alias="ADMIN_USERNAMES")
@@ -6,11 +6,21 @@ from config import Config
 
 config = Config()  # type: ignore
 
+_maker: sessionmaker | None = None
+
+
+def configure(url: str | None = None) -> sessionmaker:
+    """Bind new connections to ``url``, the configured database by default."""
+    global _maker
+    engine = create_engine(url or str(config.pg_dns))
+    _maker = sessionmaker(bind=engine)
+    return _maker
+
 
 class Connection:
     def __init__(self):
-        engine = create_engine(str(config.pg_dns))
-        self.maker = sessionmaker(bind=engine)
+        # one engine (and its connection pool) per process
+        self.maker = _maker or configure()
 
     def __enter__(self) -> Session:
         self.session = self.maker()
@@ -20,6 +20,8 @@ class ShareStrategy(base):
     warmed_up = Column(Boolean, default=False)
     free_capital = Column(Float, default=0)
     need_reset = Column(Boolean, default=False)
+    adaptive = Column(Boolean, default=False)
+    max_live_orders = Column(Integer, nullable=True)
 
 
 class Order(base):
@@ -39,6 +41,8 @@ class Order(base):
     lots = Column(Integer, nullable=False)  # lots = quantity of shares
     price_units = Column(BigInteger)
     price_nanos = Column(BigInteger)  # price = price_units + price_nanos / 1e9
+    avg_price_units = Column(BigInteger)  # executed average price, set on fill
+    avg_price_nanos = Column(BigInteger)
     direction = Column(String)  # buy or sell
     type = Column(String)  # limit or market
     status = Column(String)  # status of order
@@ -1,28 +1,25 @@
 from loguru import logger
 from .models import ShareStrategy
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
 
 
 def get_share_strategies(
-    session: Session, strategy: int | None = None, ticker: str | None = None
+    session: Session,
+    strategy: int | None = None,
+    ticker: str | None = None,
+    tickers: list[str] | None = None,
 ):
-    if strategy is not None and ticker is not None:
-        return (
-            session.query(ShareStrategy)
-            .filter(ShareStrategy.strategy == strategy)
-            .filter(ShareStrategy.ticker == ticker)
-            .all()
-        )
-    elif strategy is not None:
-        return (
-            session.query(ShareStrategy)
-            .filter(ShareStrategy.strategy == strategy)
-            .all()
-        )
-    elif ticker is not None:
-        return session.query(ShareStrategy).filter(ShareStrategy.ticker == ticker).all()
-    else:
+    filt = []
+    if strategy is not None:
+        filt.append(ShareStrategy.strategy == strategy)
+    if ticker is not None:
+        filt.append(ShareStrategy.ticker == ticker)
+    if tickers is not None:
+        filt.append(ShareStrategy.ticker.in_(tickers))
+    if len(filt) == 0:
         return session.query(ShareStrategy).all()
+    return session.query(ShareStrategy).filter(*filt).all()
 
 
 def add_share_strategy(
@@ -58,7 +55,9 @@ def update_share_strategy(
     step_trigger: float | None = None,
     step_amount: int | None = None,
     warmed_up: bool | None = None,
-    need_reset: bool = False,
+    need_reset: bool | None = False,
+    adaptive: bool | None = None,
+    max_live_orders: int | None = None,
 ):
     share_strategies = get_share_strategies(session, strategy, ticker)
     if share_strategies:
@@ -73,6 +72,11 @@ def update_share_strategy(
             share_strategy.warmed_up = warmed_up  # type: ignore
         if need_reset is not None:
             share_strategy.need_reset = need_reset  # type: ignore
+        if adaptive is not None:
+            share_strategy.adaptive = adaptive  # type: ignore
+        if max_live_orders is not None:
+            # 0 removes the limit
+            share_strategy.max_live_orders = max_live_orders or None  # type: ignore
         session.commit()
 
 
@@ -84,3 +88,22 @@ def del_share_strategy(session, strategy: int, ticker: str):
         session.commit()
     else:
         raise ValueError("Share strategy not found")
+
+
+def apply_free_capital(
+    session: Session,
+    changes: dict[tuple[int, str], tuple[float | None, float]],
+):
+    for (strategy, ticker), (absolute, delta) in changes.items():
+        if absolute is not None:
+            value = absolute + delta
+        else:
+            value = func.coalesce(ShareStrategy.free_capital, 0) + delta
+        session.execute(
+            update(ShareStrategy)
+            .where(ShareStrategy.strategy == strategy)
+            .where(ShareStrategy.ticker == ticker)
+            .values(free_capital=value)
+        )
+    session.commit()
+    logger.debug(f"Updated free capital for {len(changes)} share strategies")
@@ -0,0 +1,2 @@
+from .candles import COLUMNS, INTERVALS, Candles, Interval, get_interval
+from .store import CandleSeries, CandleStore, store, sync_strategy_candles
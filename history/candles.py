@@ -0,0 +1,121 @@
+import datetime
+from dataclasses import dataclass
+
+import numpy as np
+from tinkoff.invest import CandleInterval
+
+from trading.price import NANO, Price
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+
+@dataclass
+class Candles:
+    """OHLCV bars, prices in nanos and time in UTC epoch seconds."""
+
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __post_init__(self) -> None:
+        sizes = {len(getattr(self, name)) for name in COLUMNS}
+        if len(sizes) != 1:
+            raise ValueError(f"Candle columns have different lengths: {sizes}")
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __getitem__(self, index: slice) -> "Candles":
+        return Candles(*(getattr(self, name)[index] for name in COLUMNS))
+
+    @classmethod
+    def from_arrays(
+        cls,
+        time,
+        open,
+        high,
+        low,
+        close,
+        volume=None,
+    ) -> "Candles":
+        def to_nanos(values) -> np.ndarray:
+            return np.rint(np.asarray(values, dtype=np.float64) * NANO).astype(np.int64)
+
+        time = np.asarray(time)
+        if np.issubdtype(time.dtype, np.datetime64):
+            time = time.astype("datetime64[s]").astype(np.int64)
+        return cls(
+            time=time.astype(np.int64),
+            open=to_nanos(open),
+            high=to_nanos(high),
+            low=to_nanos(low),
+            close=to_nanos(close),
+            volume=np.asarray(
+                volume if volume is not None else np.zeros(len(time)), dtype=np.int64
+            ),
+        )
+
+    @classmethod
+    def empty(cls) -> "Candles":
+        return cls(*(np.zeros(0, dtype=np.int64) for _ in COLUMNS))
+
+    @classmethod
+    def from_historic(cls, candles: list) -> "Candles":
+        """Build from ``HistoricCandle`` messages of ``market_data.get_candles``."""
+
+        def prices(name: str) -> np.ndarray:
+            return np.array(
+                [Price.from_quotation(getattr(c, name)).value for c in candles],
+                dtype=np.int64,
+            )
+
+        return cls(
+            time=np.array([int(c.time.timestamp()) for c in candles], dtype=np.int64),
+            open=prices("open"),
+            high=prices("high"),
+            low=prices("low"),
+            close=prices("close"),
+            volume=np.array([int(c.volume) for c in candles], dtype=np.int64),
+        )
+
+    def start(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(int(self.time[0]), datetime.timezone.utc)
+
+    def end(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(
+            int(self.time[-1]), datetime.timezone.utc
+        )
+
+
+@dataclass(frozen=True)
+class Interval:
+    name: str
+    candle_interval: CandleInterval
+    seconds: int
+    window: int  # longest range get_candles accepts, seconds
+
+
+INTERVALS = {
+    interval.name: interval
+    for interval in [
+        Interval("1min", CandleInterval.CANDLE_INTERVAL_1_MIN, 60, 24 * 60 * 60),
+        Interval("5min", CandleInterval.CANDLE_INTERVAL_5_MIN, 5 * 60, 24 * 60 * 60),
+        Interval("15min", CandleInterval.CANDLE_INTERVAL_15_MIN, 15 * 60, 24 * 60 * 60),
+        Interval(
+            "hour", CandleInterval.CANDLE_INTERVAL_HOUR, 60 * 60, 7 * 24 * 60 * 60
+        ),
+        Interval(
+            "day", CandleInterval.CANDLE_INTERVAL_DAY, 24 * 60 * 60, 365 * 24 * 60 * 60
+        ),
+    ]
+}
+
+
+def get_interval(interval: "str | CandleInterval") -> Interval:
+    for item in INTERVALS.values():
+        if interval == item.name or interval == item.candle_interval:
+            return item
+    raise ValueError(f"Unknown candle interval: {interval}")
@@ -0,0 +1,249 @@
+import asyncio
+import datetime
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from config import Config
+from .candles import COLUMNS, Candles, Interval, get_interval
+
+config = Config()  # type: ignore
+
+DTYPE = np.dtype(np.int64)
+
+
+def to_timestamp(value: datetime.datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp())
+
+
+def to_datetime(value: int) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+
+
+class CandleSeries:
+    """Candles of one ticker and interval, one raw int64 file per column.
+
+    Columns are appended in place and read through ``np.memmap``. ``meta.json``
+    keeps the time ranges already fetched, including ranges without trades.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.meta_path = path / "meta.json"
+        self.covered: list[list[int]] = []
+        if self.meta_path.exists():
+            self.covered = json.loads(self.meta_path.read_text())["covered"]
+        self._candles: Candles | None = None
+
+    def column_path(self, name: str) -> Path:
+        return self.path / f"{name}.bin"
+
+    def __len__(self) -> int:
+        sizes = [
+            (
+                self.column_path(name).stat().st_size // DTYPE.itemsize
+                if self.column_path(name).exists()
+                else 0
+            )
+            for name in COLUMNS
+        ]
+        # a crash between column appends leaves the tail uneven
+        return min(sizes)
+
+    def candles(self) -> Candles:
+        if self._candles is None:
+            length = len(self)
+            if length == 0:
+                self._candles = Candles.empty()
+            else:
+                self._candles = Candles(
+                    *(
+                        np.memmap(
+                            self.column_path(name), dtype=DTYPE, mode="r", shape=length
+                        )
+                        for name in COLUMNS
+                    )
+                )
+        return self._candles
+
+    def read(
+        self,
+        from_: datetime.datetime | None = None,
+        to: datetime.datetime | None = None,
+    ) -> Candles:
+        """Candles with ``from_ <= time < to``, as views over the mapped files."""
+        candles = self.candles()
+        start = (
+            0 if from_ is None else np.searchsorted(candles.time, to_timestamp(from_))
+        )
+        stop = (
+            len(candles)
+            if to is None
+            else np.searchsorted(candles.time, to_timestamp(to))
+        )
+        return candles[int(start) : int(stop)]
+
+    def write(self, new: Candles) -> int:
+        if len(new) == 0:
+            return 0
+        order = np.argsort(new.time, kind="stable")
+        new = new[order]  # type: ignore
+        current = self.candles()
+        if len(current) == 0 or new.time[0] > current.time[-1]:
+            self._append(new)
+        else:
+            self._rewrite(current, new)
+        return len(new)
+
+    def _append(self, new: Candles) -> None:
+        length = len(self)
+        self._candles = None
+        for name in COLUMNS:
+            with open(self.column_path(name), "r+b" if length else "wb") as file:
+                file.truncate(length * DTYPE.itemsize)
+                file.seek(0, os.SEEK_END)
+                np.asarray(getattr(new, name), dtype=DTYPE).tofile(file)
+
+    def _rewrite(self, current: Candles, new: Candles) -> None:
+        merged = {
+            name: np.concatenate([getattr(current, name), getattr(new, name)])
+            for name in COLUMNS
+        }
+        # keep the fetched candle when a time is already stored
+        time = merged["time"][::-1]
+        _, index = np.unique(time, return_index=True)
+        index = len(time) - 1 - index
+        self._candles = None
+        for name in COLUMNS:
+            tmp = self.column_path(name).with_suffix(".tmp")
+            np.asarray(merged[name][index], dtype=DTYPE).tofile(tmp)
+            os.replace(tmp, self.column_path(name))
+
+    def missing(self, from_: int, to: int) -> list[tuple[int, int]]:
+        gaps: list[tuple[int, int]] = []
+        cursor = from_
+        for start, end in self.covered:
+            if end <= cursor:
+                continue
+            if start >= to:
+                break
+            if start > cursor:
+                gaps.append((cursor, start))
+            cursor = max(cursor, end)
+        if cursor < to:
+            gaps.append((cursor, to))
+        return gaps
+
+    def cover(self, from_: int, to: int) -> None:
+        ranges = sorted(self.covered + [[from_, to]])
+        merged: list[list[int]] = []
+        for start, end in ranges:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.covered = merged
+        tmp = self.meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"covered": merged}))
+        os.replace(tmp, self.meta_path)
+
+
+class CandleStore:
+    def __init__(self, root: str) -> None:
+        self.root = Path(root)
+        self.series_cache: dict[tuple[str, str], CandleSeries] = {}
+        self.locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+    def series(self, ticker: str, interval: str = "1min") -> CandleSeries:
+        name = get_interval(interval).name
+        key = (ticker, name)
+        if key not in self.series_cache:
+            self.series_cache[key] = CandleSeries(self.root / ticker / name)
+        return self.series_cache[key]
+
+    def read(
+        self,
+        ticker: str,
+        interval: str = "1min",
+        from_: datetime.datetime | None = None,
+        to: datetime.datetime | None = None,
+    ) -> Candles:
+        return self.series(ticker, interval).read(from_, to)
+
+    async def sync(
+        self,
+        client,
+        ticker: str,
+        interval: str = "1min",
+        from_: datetime.datetime | None = None,
+        to: datetime.datetime | None = None,
+    ) -> int:
+        """Fetch the closed candles of ``[from_, to)`` that are not stored yet."""
+        spec: Interval = get_interval(interval)
+        now = to_timestamp(datetime.datetime.now(datetime.timezone.utc))
+        end = min(to_timestamp(to) if to else now, now)
+        end -= end % spec.seconds
+        start = (
+            to_timestamp(from_)
+            if from_
+            else end - config.CANDLES_HISTORY_DAYS * 24 * 60 * 60
+        )
+        start -= start % spec.seconds
+
+        key = (ticker, spec.name)
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            series = self.series(ticker, spec.name)
+            added = 0
+            for gap_from, gap_to in series.missing(start, end):
+                for chunk_from in range(gap_from, gap_to, spec.window):
+                    chunk_to = min(chunk_from + spec.window, gap_to)
+                    historic = await client.get_candles(
+                        ticker,
+                        to_datetime(chunk_from),
+                        to_datetime(chunk_to),
+                        spec.candle_interval,
+                    )
+                    complete = [c for c in historic if c.is_complete]
+                    if len(complete) < len(historic):
+                        # not closed yet, fetch it again next time
+                        first_open = min(
+                            to_timestamp(c.time) for c in historic if not c.is_complete
+                        )
+                        chunk_to = max(min(chunk_to, first_open), chunk_from)
+                    added += series.write(Candles.from_historic(complete))
+                    series.cover(chunk_from, chunk_to)
+        if added:
+            logger.debug(f"Stored {added} {spec.name} candles for {ticker}")
+        return added
+
+
+store = CandleStore(config.CANDLES_DIR)
+
+
+async def sync_strategy_candles(
+    interval: str = "1min", only: set[str] | None = None
+) -> list[str]:
+    from db import Connection
+    from db.strategies import get_share_strategies
+    from trading.client import get_client
+
+    with Connection() as db:
+        tickers = sorted({str(s.ticker) for s in get_share_strategies(db)})
+    if only is not None:
+        tickers = [ticker for ticker in tickers if ticker in only]
+    if not tickers:
+        return tickers
+    async with get_client() as client:
+        for ticker in tickers:
+            try:
+                await store.sync(client, ticker, interval)
+            except Exception as e:
+                logger.error(f"Failed to sync candles for {ticker}: {e}")
+    return tickers
@@ -0,0 +1,86 @@
+import json
+import sys
+import threading
+import time
+import traceback
+
+from loguru import logger
+
+from config import Config
+
+config = Config()  # type: ignore
+
+FORMAT = "{level} | {message}"
+
+# per-zone and per-order lines, rate limited per call site by SampleFilter
+sampled = logger.bind(sampled=True)
+
+
+class SampleFilter:
+    """Lets through ``limit`` sampled records per call site and ``window``."""
+
+    def __init__(self, limit: int, window: float = 60) -> None:
+        self.limit = limit
+        self.window = window
+        self.sites: dict[tuple, list] = {}  # site -> [window start, passed, dropped]
+        self.lock = threading.Lock()
+
+    def __call__(self, record) -> bool:
+        if not record["extra"].get("sampled"):
+            return True
+        site = (record["name"], record["function"], record["line"])
+        now = time.monotonic()
+        with self.lock:
+            state = self.sites.get(site)
+            if state is None or now - state[0] >= self.window:
+                dropped = state[2] if state is not None else 0
+                state = [now, 0, 0]
+                self.sites[site] = state
+                if dropped:
+                    record["message"] += f" (+{dropped} similar suppressed)"
+            if state[1] >= self.limit:
+                state[2] += 1
+                return False
+            state[1] += 1
+        return True
+
+
+def json_format(record) -> str:
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    payload.update(
+        (key, value)
+        for key, value in record["extra"].items()
+        if key not in ("sampled", "json")
+    )
+    if record["exception"] is not None:
+        payload["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["json"] = json.dumps(payload, ensure_ascii=False, default=str)
+    return "{extra[json]}\n"
+
+
+def setup_logging(
+    level: str = config.LOG_LEVEL,
+    serialize: bool = config.LOG_JSON,
+    sample_limit: int = config.LOG_SAMPLE_PER_MINUTE,
+) -> None:
+    """Writes to stdout go through a background thread, not the event loop.
+
+    Messages are formatted only for enabled levels when logged as
+    ``logger.debug("... {}", value)`` instead of an f-string.
+    """
+    logger.remove()
+    logger.add(
+        sys.stdout,
+        level=level,
+        format=json_format if serialize else FORMAT,
+        colorize=not serialize,
+        filter=SampleFilter(sample_limit),
+        enqueue=True,
+    )
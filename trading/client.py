@@ -1,9 +1,11 @@
 import datetime
 from typing import Callable, Coroutine
 
-from db.models import AddOrder, UpdateOrder
-from .orders import Order, Direction, LimitOrder, MarketOrder, Quotation
+from db.models import AddOrder
+from .orders import Order, Direction, LimitOrder, MarketOrder
+from .price import Price
 from tinkoff.invest import (
+    Account,
     AsyncClient,
     Share,
     AccessLevel,
@@ -17,31 +19,69 @@ from tinkoff.invest import (
     PositionsResponse,
     Operation,
     OrderState,
+    GetTradingStatusResponse,
+    CandleInterval,
+    HistoricCandle,
 )
 from tinkoff.invest.async_services import AsyncServices
 from config import Config
+from logs import sampled
 from loguru import logger
-from aiocache import cached, Cache  # type: ignore
 from .errors import InvestError
-
-from db.orders import add_order, update_order, Order as DBOrder
+from .events import OrderEvent
+from .instruments import catalog
+from .leader import leadership
+from .metrics import MetricsInterceptor
+from .schedule import DAYS_AHEAD, calendar
+from .singleflight import single_flight
+from .tracing import traced, tracer
+
+from db.orders import add_order, Order as DBOrder
 from db import Connection
+from sqlalchemy import true
 
 config = Config()  # type: ignore
 
 
+_accounts: dict[str, Account] = {}
+
+
+def select_account(accounts: list[Account], account_id: str | None) -> Account:
+    if not accounts:
+        logger.error("ACCOUNT: No accounts found")
+        raise ValueError("No accounts found")
+    if account_id is not None:
+        for account in accounts:
+            if account.id == account_id:
+                return account
+        logger.error(f"ACCOUNT: Account {account_id} not found")
+        raise ValueError(f"Account {account_id} not found")
+    if len(accounts) > 1:
+        ids = ", ".join(account.id for account in accounts)
+        logger.error(f"ACCOUNT: More than one account found: {ids}")
+        raise ValueError(f"More than one account found ({ids}), set TINKOFF_ACCOUNT_ID")
+    return accounts[0]
+
+
 class InvestClient:
-    def __init__(self, token: str) -> None:
-        self.client = AsyncClient(token)
+    def __init__(self, token: str, client=None) -> None:
+        self.token = token
+        self.client = (
+            client
+            if client is not None
+            else AsyncClient(token, interceptors=[MetricsInterceptor()])
+        )
         self.services: AsyncServices
         self.is_opened = False
+        self.account: Account
+        self.account_id: str
 
         self.buffer = []
 
     async def __aenter__(self) -> "InvestClient":
         self.services = await self.client.__aenter__()
         self.is_opened = True
-        await self.health_check()
+        await self.resolve_account()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> bool:
@@ -63,15 +103,24 @@ class InvestClient:
         return wrapper
 
     @check_opened
-    async def health_check(self):
+    async def resolve_account(self):
+        account = _accounts.get(self.token)
+        if account is None:
+            account = await self.fetch_account()
+        self.account = account
+        self.account_id = account.id
+
+    @check_opened
+    @single_flight
+    async def fetch_account(self) -> Account:
         accounts = (await self.services.users.get_accounts()).accounts
-        if not accounts:
-            logger.error("ACCOUNT: No accounts found")
-            raise ValueError("No accounts found")
-        elif len(accounts) > 1:
-            logger.warning("ACCOUNT: More than one account found")
+        account = select_account(accounts, config.TINKOFF_ACCOUNT_ID)
+        self.health_check(account)
+        _accounts[self.token] = account
+        logger.info(f"ACCOUNT: Using account {account.id}")
+        return account
 
-        account = accounts[0]
+    def health_check(self, account: Account):
         if account.access_level != AccessLevel.ACCOUNT_ACCESS_LEVEL_FULL_ACCESS:
             logger.error("ACCESS: Account does not have full access")
             raise ValueError("Account does not have full access")
@@ -83,12 +132,8 @@ class InvestClient:
         logger.debug("Health check passed")
 
     @check_opened
-    @cached(ttl=60, cache=Cache.MEMORY)
-    async def get_account(self):
-        response = await self.services.users.get_accounts()
-        if not response.accounts:
-            raise ValueError("No accounts found")
-        return response.accounts[0]
+    async def get_account(self) -> Account:
+        return self.account
 
     @check_opened
     async def log_info(self):
@@ -124,105 +169,99 @@ class InvestClient:
             logger.info(msg)
 
     @check_opened
-    @cached(ttl=600, cache=Cache.MEMORY)
+    @single_flight
     async def get_shares(self) -> list[Share]:
-        shares = (await self.services.instruments.shares()).instruments
-        shares = [
-            share
-            for share in shares
-            if share.exchange
-            in [
-                "MOEX",
-                "MOEX_EVENING_WEEKEND",
-            ]  # filter only MOEX and MOEX_EVENING_WEEKEND shares# filter only MOEX and MOEX_EVENING_WEEKEND shares
-        ]
-        return shares
+        if catalog.is_stale:
+            shares = (await self.services.instruments.shares()).instruments
+            if catalog.update(shares):
+                logger.info(f"Instrument catalog updated: {len(catalog.shares)} shares")
+        return catalog.shares
 
     @check_opened
     async def get_share_by_ticker(self, ticker: str) -> Share | None:
-        shares = await self.get_shares()
-        for share in shares:
-            if share.ticker == ticker:
-                return share
-        return None
+        await self.get_shares()
+        return catalog.by_ticker.get(ticker)
 
     @check_opened
     async def get_share_by_figi(self, figi: str) -> Share | None:
-        shares = await self.get_shares()
-        for share in shares:
-            if share.figi == figi:
-                return share
-        return None
+        await self.get_shares()
+        return catalog.by_figi.get(figi)
+
+    @check_opened
+    @single_flight
+    async def update_trading_calendar(self) -> None:
+        if not calendar.is_stale:
+            return
+        today = datetime.datetime.now(datetime.timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        try:
+            response = await self.services.instruments.trading_schedules(
+                from_=today, to=today + datetime.timedelta(days=DAYS_AHEAD)
+            )
+        except AioRequestError as e:
+            calendar.fail()
+            logger.error(f"Failed to get trading schedules: {InvestError(e)}")
+            return
+        calendar.update(response.exchanges)
 
     @check_opened
-    async def get_last_price(self, ticker: str) -> Quotation:
+    @single_flight
+    async def get_last_price(self, ticker: str) -> Price:
         share = await self.get_share_by_ticker(ticker)
         if share is None:
             raise ValueError(f"Share {ticker} not found")
-        return Quotation(
+        return Price.from_quotation(
             (await self.services.market_data.get_last_prices(figi=[share.figi]))
             .last_prices[0]
             .price
         )
 
     @check_opened
-    async def get_last_closed(self, ticker: str):
+    @single_flight
+    async def get_candles(
+        self,
+        ticker: str,
+        from_: datetime.datetime,
+        to: datetime.datetime,
+        interval: CandleInterval,
+    ) -> list[HistoricCandle]:
         share = await self.get_share_by_ticker(ticker)
         if share is None:
             raise ValueError(f"Share {ticker} not found")
-        with Connection() as db:
-            today = datetime.datetime.now(datetime.timezone.utc)
-            today = today.replace(hour=1, minute=0, second=0, microsecond=0)
-            last = (
-                db.query(DBOrder)
-                .filter(
-                    (DBOrder.figi == share.figi)
-                    & (DBOrder.status == "fill")
-                    & (DBOrder.type == "limit")
-                    & (DBOrder.created_at > today)  # too old
-                )
-                .order_by(DBOrder.updated_at.desc())
-                .first()
+        return (
+            await self.services.market_data.get_candles(
+                figi=share.figi,
+                instrument_id=share.figi,
+                from_=from_,
+                to=to,
+                interval=interval,
             )
-        return last
+        ).candles
 
     @check_opened
+    @single_flight
     async def get_order_info(self, order_id: str) -> OrderState:
         return await self.services.orders.get_order_state(
-            account_id=(await self.get_account()).id,
+            account_id=self.account_id,
             order_id=order_id,
         )
 
     @check_opened
-    async def find_open_orders(self, ticker: str, from_: Quotation, to: Quotation):
-        share = await self.get_share_by_ticker(ticker)
-        if share is None:
-            raise ValueError(f"Share {ticker} not found")
-        with Connection() as db:
-            orders = (
-                db.query(DBOrder)
-                .filter(
-                    (DBOrder.figi == share.figi)
-                    & (DBOrder.status == "created")
-                    & (
-                        DBOrder.price_units * 10**9 + DBOrder.price_nanos
-                        >= from_.units * 10**9 + from_.nano
-                    )
-                    & (
-                        DBOrder.price_units * 10**9 + DBOrder.price_nanos
-                        <= to.units * 10**9 + to.nano
-                    )
-                )
-                .all()
-            )
-        return orders
+    @single_flight
+    async def get_trading_status(self, figi: str) -> GetTradingStatusResponse:
+        status = calendar.cached_status(figi)
+        if status is None:
+            status = await self.services.market_data.get_trading_status(figi=figi)
+            calendar.store_status(figi, status)
+        return status
 
     @check_opened
     async def is_limit_available(self, ticker: str) -> bool:
         share = await self.get_share_by_ticker(ticker)
         if share is None:
             raise ValueError(f"Share {ticker} not found")
-        response = await self.services.market_data.get_trading_status(figi=share.figi)
+        response = await self.get_trading_status(share.figi)
         return response.limit_order_available_flag
 
     @check_opened
@@ -230,13 +269,15 @@ class InvestClient:
         share = await self.get_share_by_ticker(ticker)
         if share is None:
             raise ValueError(f"Share {ticker} not found")
-        response = await self.services.market_data.get_trading_status(figi=share.figi)
+        response = await self.get_trading_status(share.figi)
         return response.market_order_available_flag
 
     @check_opened
     async def order(self, order: Order) -> PostOrderResponse:
         if not isinstance(order, Order):
             raise ValueError("Invalid order")
+        if config.LEADER_ELECTION:
+            await leadership.fence()
         logger.info(f"Creating order: {order}")
         share = await self.get_share_by_ticker(order.ticker)
         if not share:
@@ -253,15 +294,12 @@ class InvestClient:
 
         order_id = str(datetime.datetime.now(datetime.timezone.utc).timestamp())
         order_type: OrderType = OrderType.ORDER_TYPE_UNSPECIFIED
-        price: Quotation = Quotation(0)
+        price = Price(0)
         if isinstance(order, LimitOrder):
             order_type = OrderType.ORDER_TYPE_LIMIT
-            price = order.price
-            min_increment = share.min_price_increment
-            bn_price = price.units * 10**9 + price.nano
-            bn_min_increment = min_increment.units * 10**9 + min_increment.nano
-            bn_price = round(bn_price / bn_min_increment) * bn_min_increment
-            price = Quotation(bn_price // 10**9, bn_price % 10**9)
+            price = order.price.round_to(
+                Price.from_quotation(share.min_price_increment)
+            )
             if not (await self.is_limit_available(order.ticker)):
                 logger.error(f"Limit orders are not available for {order.ticker}")
                 raise ValueError(f"Limit orders are not available for {order.ticker}")
@@ -279,19 +317,31 @@ class InvestClient:
             figi=share.figi,
             order_type=order_type,
             quantity=order.lots // share.lot,
-            price=price,
+            price=price.to_quotation(),
             direction=order.direction.to_order_direction(),
             order_id=str(order_id),
-            account_id=(await self.get_account()).id,
+            account_id=self.account_id,
         )
-        logger.debug(
-            f"Created order: figi={share.figi},"
-            f"order_id={order_id}, order_type={order_type},"
-            f"quantity={order.lots}, price={price},"
-            f"direction={order.direction.to_order_direction()},"
-            f"account_id={(await self.get_account()).id}"
+        sampled.debug(
+            "Created order: figi={}, order_id={}, order_type={}, quantity={},"
+            " price={}, direction={}, account_id={}",
+            share.figi,
+            order_id,
+            order_type.name,
+            order.lots,
+            price,
+            order.direction.name,
+            self.account_id,
         )
         logger.info(f"Order {order_response.order_id} created")
+        tracer.order(
+            order_id=order_response.order_id,
+            ticker=order.ticker,
+            direction=order.direction.name,
+            type=order_type.name,
+            lots=order.lots,
+            price=price,
+        )
         with Connection() as session:
             add_order(
                 session,
@@ -304,7 +354,7 @@ class InvestClient:
                     direction=order.direction.name,
                     type=order_type.name,
                     status="created",
-                    account_id=(await self.get_account()).id,
+                    account_id=self.account_id,
                 ),
             )
         return order_response
@@ -315,11 +365,9 @@ class InvestClient:
         *,
         ticker: str,
         lots: int,
-        price: Quotation | int | float,
+        price: Price | int | float,
         direction: Direction,
     ) -> None:
-        if isinstance(price, (int, float)):
-            price = Quotation(price)
         await self.order(LimitOrder(ticker, lots, direction, price))
 
     @check_opened
@@ -338,10 +386,8 @@ class InvestClient:
         *,
         ticker: str,
         lots: int,
-        price: Quotation | int | float,
+        price: Price | int | float,
     ) -> None:
-        if isinstance(price, (int, float)):
-            price = Quotation(price)
         await self.limit(ticker=ticker, lots=lots, price=price, direction=Direction.BUY)
 
     @check_opened
@@ -350,7 +396,7 @@ class InvestClient:
         *,
         ticker: str,
         lots: int,
-        price: Quotation | int | float,
+        price: Price | int | float,
     ) -> None:
         await self.limit(
             ticker=ticker, lots=lots, price=price, direction=Direction.SELL
@@ -383,12 +429,13 @@ class InvestClient:
                 raise ValueError(f"Order {order_id} not found")
 
             await self.services.orders.cancel_order(
-                account_id=(await self.get_account()).id,
+                account_id=self.account_id,
                 order_id=order_id,
             )
             logger.info(f"Order {order_id} canceled")
 
     @check_opened
+    @single_flight
     async def get_positions(
         self,
         *,
@@ -398,9 +445,8 @@ class InvestClient:
         if ticker and figi:
             raise ValueError("Both ticker and figi are specified")
 
-        account_id = (await self.get_account()).id
         positions: PositionsResponse = await self.services.operations.get_positions(
-            account_id=account_id
+            account_id=self.account_id
         )
         if ticker:
             share = await self.get_share_by_ticker(ticker)
@@ -415,6 +461,7 @@ class InvestClient:
         ]
 
     @check_opened
+    @single_flight
     async def get_lots(self, figi: str) -> int:
         positions = await self.get_positions()
         for position in positions:
@@ -423,13 +470,15 @@ class InvestClient:
         return 0
 
     @check_opened
-    async def get_balance(self, currency: str = "rub") -> Quotation:
-        account_id = (await self.get_account()).id
-        response = await self.services.operations.get_positions(account_id=account_id)
+    @single_flight
+    async def get_balance(self, currency: str = "rub") -> Price:
+        response = await self.services.operations.get_positions(
+            account_id=self.account_id
+        )
         money = response.money
         for position in money:
             if position.currency == currency:
-                return Quotation(position.units, position.nano)
+                return Price.from_quotation(position)
         raise ValueError(f"Currency {currency} not found")
 
     async def get_history(
@@ -443,26 +492,33 @@ class InvestClient:
                 from_=from_,
                 to=to,
                 figi=share.figi,
-                account_id=(await self.get_account()).id,
+                account_id=self.account_id,
             )
         ).operations
 
     @check_opened
+    @traced
     async def update_orders(
         self,
-        on_fill: Callable[[str], Coroutine] | None = None,
-        on_reject: Callable[[str], Coroutine] | None = None,
-        on_cancel: Callable[[str], Coroutine] | None = None,
-    ):
+        on_events: Callable[[list[OrderEvent]], Coroutine] | None = None,
+        figis: list[str] | None = None,
+        skip_figis: list[str] | None = None,
+    ) -> list[OrderEvent]:
+        events: list[OrderEvent] = []
         with Connection() as session:
             true_active = (
-                await self.services.orders.get_orders(
-                    account_id=(await self.get_account()).id
-                )
+                await self.services.orders.get_orders(account_id=self.account_id)
             ).orders
-            true_active_ids = [order.order_id for order in true_active]
+            true_active_ids = {order.order_id for order in true_active}
 
-            orders = session.query(DBOrder).filter((DBOrder.status == "created")).all()
+            scope = DBOrder.figi.in_(figis) if figis is not None else true()
+            if skip_figis:
+                scope = scope & DBOrder.figi.not_in(skip_figis)
+            orders = (
+                session.query(DBOrder)
+                .filter((DBOrder.status == "created") & scope)
+                .all()
+            )
             counter = 0
             for order in orders:
                 if order.order_id not in true_active_ids:
@@ -471,13 +527,18 @@ class InvestClient:
             session.commit()
             logger.info(f"New unknown orders: {counter}")
 
-            orders = session.query(DBOrder).filter((DBOrder.status == "unknown")).all()
+            orders = (
+                session.query(DBOrder)
+                .filter((DBOrder.status == "unknown") & scope)
+                .all()
+            )
             limit = 40
             if not orders:
                 logger.info("No orders to update")
             else:
                 logger.info(f"Updating {min(len(orders), limit)} orders")
 
+            await self.get_shares()
             for order in orders[:limit]:
                 order_response = await self.services.orders.get_order_state(
                     account_id=order.account_id, order_id=order.order_id  # type: ignore
@@ -500,18 +561,41 @@ class InvestClient:
                     logger.info(
                         f"Order {order.order_id} updated: {order.status} -> {status}"
                     )
-                    update_order(session, UpdateOrder(order_id=order.order_id, status=status))  # type: ignore
-                    if status == "fill" and on_fill is not None:
-                        await on_fill(order_response.order_id)
-                    if status == "rejected" and on_reject is not None:
-                        await on_reject(order_response.order_id)
-                    if status == "cancelled" and on_cancel is not None:
-                        await on_cancel(order_response.order_id)
+                    share = catalog.by_figi.get(str(order.figi))
+                    average_price = None
+                    if status == "fill":
+                        average_price = Price.from_quotation(
+                            order_response.average_position_price
+                        )
+                        order.avg_price_units = average_price.units  # type: ignore
+                        order.avg_price_nanos = average_price.nano  # type: ignore
+                    events.append(
+                        OrderEvent(
+                            order_id=str(order.order_id),
+                            figi=str(order.figi),
+                            ticker=share.ticker if share else None,
+                            direction=Direction.from_str(str(order.direction)),
+                            lots=int(order.lots),  # type: ignore
+                            price=Price.from_units(
+                                int(order.price_units or 0),  # type: ignore
+                                int(order.price_nanos or 0),  # type: ignore
+                            ),
+                            previous_status=str(order.status),
+                            status=status,
+                            order_type=str(order.type),
+                            average_price=average_price,
+                        )
+                    )
+                    order.status = status  # type: ignore
                 else:
-                    logger.debug(f"Order {order.order_id} unchanged: {status}")
+                    sampled.debug("Order {} unchanged: {}", order.order_id, status)
             session.commit()
+        if events and on_events is not None:
+            await on_events(events)
+        return events
 
     @check_opened
+    @single_flight
     async def get_lots_amount(
         self, *, ticker: str | None = None, figi: str | None = None
     ) -> int:
@@ -533,9 +617,7 @@ class InvestClient:
         else:
             logger.info(f"Cancelling all orders for {figi}")
 
-        orders = await self.services.orders.get_orders(
-            account_id=(await self.get_account()).id
-        )
+        orders = await self.services.orders.get_orders(account_id=self.account_id)
         for order in orders.orders:
             if order.figi == figi:
                 await self.cancel_order(order.order_id)
@@ -543,4 +625,10 @@ class InvestClient:
 
 
 def get_client(token: str = config.TINKOFF_TOKEN):
+    if config.BROKER == "simulator":
+        from .simulator import SimulatedClient, get_exchange
+
+        return InvestClient(
+            token, SimulatedClient(get_exchange(config.SIMULATOR_SCENARIO))
+        )
     return InvestClient(token)
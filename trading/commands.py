@@ -0,0 +1,14 @@
+from loguru import logger
+
+from .ledger import ledger
+
+
+async def handle_command(fields: dict[str, str]) -> None:
+    """Applies a command sent by the bot process over the bus."""
+    match fields.get("command"):
+        case "forget":
+            key = (int(fields["strategy"]), fields["ticker"])
+            ledger.forget(key)
+            logger.info(f"Forgot ledger account {key}")
+        case command:
+            logger.warning(f"Unknown command: {command}")
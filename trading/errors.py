@@ -1,21 +1,54 @@
-from requests import get
+import threading
+import time
+
+from loguru import logger
+from requests import RequestException, get
 from tinkoff.invest import AioRequestError
 
 URL = "https://raw.githubusercontent.com/RussianInvestments/investAPI/main/src/docs/errors/api_errors.json"
-DATA = get(URL).json()
+RETRY_AFTER = 300  # seconds before fetching again after a failure
+
+_data: dict = {}
+_attempted_at = -RETRY_AFTER
+_lock = threading.Lock()
+
+
+def _fetch() -> None:
+    global _data
+    try:
+        _data = get(URL, timeout=10).json()
+    except (RequestException, ValueError) as e:
+        logger.warning(f"Could not load API error descriptions: {e}")
+
+
+def load_error_data() -> None:
+    """Fetches the error descriptions in a thread, never on the event loop."""
+    global _attempted_at
+    with _lock:
+        if _data or time.monotonic() - _attempted_at < RETRY_AFTER:
+            return
+        _attempted_at = time.monotonic()
+    threading.Thread(target=_fetch, name="api-errors", daemon=True).start()
+
+
+def get_error_data() -> dict:
+    # errors stay unwrapped until the descriptions have been loaded
+    load_error_data()
+    return _data
 
 
 class InvestError(Exception):
     def __new__(cls, base: Exception):
-        if isinstance(base, AioRequestError) and base.code in DATA:
+        if isinstance(base, AioRequestError) and base.code in get_error_data():
             return super().__new__(cls)
         return base
 
     def __init__(self, base: AioRequestError):
+        data = get_error_data()
         self.code = base.code
-        self.message = DATA[self.code]["message"]
-        self.description = DATA[self.code]["description"]
-        self.type = DATA[self.code]["type"]
+        self.message = data[self.code]["message"]
+        self.description = data[self.code]["description"]
+        self.type = data[self.code]["type"]
 
     def __str__(self):
         return f"[{self.code}] {self.description}"
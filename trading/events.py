@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+
+from .orders import Direction
+from .price import Price
+
+
+@dataclass
+class OrderEvent:
+    order_id: str
+    figi: str
+    ticker: str | None
+    direction: Direction
+    lots: int
+    price: Price
+    previous_status: str
+    status: str
+    order_type: str  # as stored, e.g. ORDER_TYPE_LIMIT
+    average_price: Price | None = None
+
+    @property
+    def amount(self) -> Price:
+        return self.price * self.lots
+
+
+def group_by_ticker(events: list[OrderEvent]) -> dict[str, list[OrderEvent]]:
+    groups: dict[str, list[OrderEvent]] = {}
+    for event in events:
+        if event.ticker is None:
+            continue
+        groups.setdefault(event.ticker, []).append(event)
+    return groups
@@ -0,0 +1,98 @@
+from bisect import bisect_left, insort
+from fractions import Fraction
+from typing import Iterable, Iterator
+
+from .orders import Direction
+from .price import Price
+
+FREE_COEF = Fraction(1, 10)
+MIN_PRICE_COEF = Fraction(8, 10)
+MAX_PRICE_COEF = Fraction(12, 10)
+
+# adaptive zones are as wide as the typical move over this many bars,
+# kept within [1/2, 2] of the configured step
+ADAPTIVE_HORIZON = 60
+ADAPTIVE_MIN = Fraction(1, 2)
+ADAPTIVE_MAX = Fraction(2)
+
+
+def get_step(step_trigger: float) -> Fraction:
+    return Fraction(str(step_trigger)) / 100
+
+
+def get_adaptive_step(step: Fraction, atr: float | None, price: float) -> Fraction:
+    if atr is None or price <= 0:
+        return step
+    volatility = Fraction(atr * ADAPTIVE_HORIZON**0.5 / price).limit_denominator(10**6)
+    return min(max(volatility, step * ADAPTIVE_MIN), step * ADAPTIVE_MAX)
+
+
+def buy_limit(max_live_orders: int) -> int:
+    # buys get half of the cap, rounded up, so a full buy ladder can't
+    # block the sells; the sells take the rest of it
+    return (max_live_orders + 1) // 2
+
+
+def get_zone(price: Price, price_step: Fraction | float, i: int) -> tuple[Price, Price]:
+    free_coef = FREE_COEF
+    zone_size = price * price_step
+    if i > 0:
+        zone_down = price + zone_size * (i - 1) - zone_size * free_coef + zone_size / 2
+        zone_up = price + zone_size * i + zone_size * free_coef + zone_size / 2
+    elif i < 0:
+        i = -i
+        zone_down = price - zone_size * i - zone_size * free_coef - zone_size / 2
+        zone_up = price - zone_size * (i - 1) + zone_size * free_coef - zone_size / 2
+    else:
+        return price, price
+    return zone_down, zone_up
+
+
+class Occupancy:
+    """Sorted prices (nanos) of the open orders of one instrument."""
+
+    def __init__(self, prices: Iterable[int] = ()) -> None:
+        self.prices = sorted(prices)
+
+    def add(self, price: Price) -> None:
+        insort(self.prices, price.value)
+
+    def remove(self, price: Price) -> None:
+        i = bisect_left(self.prices, price.value)
+        if i < len(self.prices) and self.prices[i] == price.value:
+            del self.prices[i]
+
+    def occupied(self, down: Price, up: Price) -> bool:
+        i = bisect_left(self.prices, down.value)
+        return i < len(self.prices) and self.prices[i] <= up.value
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+
+def free_zones(
+    anchor: Price,
+    step: Fraction,
+    current: Price,
+    direction: Direction,
+    occupancy: Occupancy,
+) -> Iterator[Price]:
+    """Midpoints of the zones without open orders, walking away from ``anchor``.
+
+    Stops at the first free zone outside 80%-120% of ``current``.
+    """
+    if step <= 0:
+        raise ValueError(f"Invalid step: {step}")
+    min_price = current * MIN_PRICE_COEF
+    max_price = current * MAX_PRICE_COEF
+    sign = -1 if direction == Direction.BUY else 1
+    zone_id = sign
+    while True:
+        zone_down, zone_up = get_zone(anchor, step, zone_id)
+        zone_id += sign
+        if occupancy.occupied(zone_down, zone_up):
+            continue
+        price = (zone_down + zone_up) / 2
+        if price < min_price or price > max_price:
+            return
+        yield price
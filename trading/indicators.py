@@ -0,0 +1,254 @@
+import datetime
+import math
+from collections import deque
+from dataclasses import dataclass
+
+from loguru import logger
+
+from history import Candles, store, sync_strategy_candles
+from trading.price import NANO
+from trading.sharding import shard
+from config import Config
+
+config = Config()  # type: ignore
+
+DAY = 24 * 60 * 60
+
+
+class EMA:
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.value: float | None = None
+
+    def update(self, x: float) -> float | None:
+        self.count += 1
+        if self.value is None:
+            # seeded with the simple average of the first period
+            self.sum += x
+            if self.count == self.period:
+                self.value = self.sum / self.period
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class Wilder:
+    """Wilder's smoothing, an EMA with ``alpha = 1 / period``."""
+
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.count = 0
+        self.sum = 0.0
+        self.value: float | None = None
+
+    def update(self, x: float) -> float | None:
+        self.count += 1
+        if self.value is None:
+            self.sum += x
+            if self.count == self.period:
+                self.value = self.sum / self.period
+        else:
+            self.value += (x - self.value) / self.period
+        return self.value
+
+
+class RSI:
+    def __init__(self, period: int = 14) -> None:
+        self.gain = Wilder(period)
+        self.loss = Wilder(period)
+        self.previous: float | None = None
+        self.value: float | None = None
+
+    def update(self, close: float) -> float | None:
+        if self.previous is not None:
+            change = close - self.previous
+            gain = self.gain.update(max(change, 0.0))
+            loss = self.loss.update(max(-change, 0.0))
+            if gain is not None and loss is not None:
+                self.value = 100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+        self.previous = close
+        return self.value
+
+
+class ATR:
+    def __init__(self, period: int = 14) -> None:
+        self.average = Wilder(period)
+        self.previous: float | None = None
+        self.value: float | None = None
+
+    def update(self, high: float, low: float, close: float) -> float | None:
+        true_range = high - low
+        if self.previous is not None:
+            true_range = max(
+                true_range, abs(high - self.previous), abs(low - self.previous)
+            )
+        self.previous = close
+        self.value = self.average.update(true_range)
+        return self.value
+
+
+class VWAP:
+    """Volume weighted typical price, reset at the start of every UTC day."""
+
+    def __init__(self) -> None:
+        self.day: int | None = None
+        self.volume = 0.0
+        self.turnover = 0.0
+        self.value: float | None = None
+
+    def update(
+        self, time: int, high: float, low: float, close: float, volume: float
+    ) -> float | None:
+        day = time // DAY
+        if day != self.day:
+            self.day = day
+            self.volume = 0.0
+            self.turnover = 0.0
+        typical = (high + low + close) / 3
+        self.volume += volume
+        self.turnover += typical * volume
+        if self.volume > 0:
+            self.value = self.turnover / self.volume
+        return self.value
+
+
+class Bollinger:
+    def __init__(self, period: int = 20, width: float = 2.0) -> None:
+        self.period = period
+        self.width = width
+        self.window: deque[float] = deque()
+        self.sum = 0.0
+        self.squares = 0.0
+        self.middle: float | None = None
+        self.upper: float | None = None
+        self.lower: float | None = None
+
+    def update(self, x: float) -> float | None:
+        self.window.append(x)
+        self.sum += x
+        self.squares += x * x
+        if len(self.window) > self.period:
+            old = self.window.popleft()
+            self.sum -= old
+            self.squares -= old * old
+        if len(self.window) == self.period:
+            mean = self.sum / self.period
+            deviation = math.sqrt(max(self.squares / self.period - mean * mean, 0.0))
+            self.middle = mean
+            self.upper = mean + self.width * deviation
+            self.lower = mean - self.width * deviation
+        return self.middle
+
+
+@dataclass
+class IndicatorValues:
+    time: datetime.datetime
+    close: float
+    ema_fast: float | None
+    ema_slow: float | None
+    rsi: float | None
+    atr: float | None
+    vwap: float | None
+    bollinger_middle: float | None
+    bollinger_upper: float | None
+    bollinger_lower: float | None
+
+
+class IndicatorSet:
+    """All indicators of one ticker, updated bar by bar."""
+
+    def __init__(self) -> None:
+        self.ema_fast = EMA(12)
+        self.ema_slow = EMA(26)
+        self.rsi = RSI(14)
+        self.atr = ATR(14)
+        self.vwap = VWAP()
+        self.bollinger = Bollinger(20, 2.0)
+        self.time: int | None = None
+        self.close: float | None = None
+        self.bars = 0
+
+    def update(
+        self,
+        time: int,
+        high: float,
+        low: float,
+        close: float,
+        volume: float,
+    ) -> None:
+        self.ema_fast.update(close)
+        self.ema_slow.update(close)
+        self.rsi.update(close)
+        self.atr.update(high, low, close)
+        self.vwap.update(time, high, low, close, volume)
+        self.bollinger.update(close)
+        self.time = time
+        self.close = close
+        self.bars += 1
+
+    def feed(self, candles: Candles) -> int:
+        """Apply the bars newer than the last one seen, returns their number."""
+        start = 0
+        if self.time is not None:
+            start = int(candles.time.searchsorted(self.time, side="right"))
+        candles = candles[start:]
+        for time, high, low, close, volume in zip(
+            candles.time.tolist(),
+            (candles.high / NANO).tolist(),
+            (candles.low / NANO).tolist(),
+            (candles.close / NANO).tolist(),
+            candles.volume.tolist(),
+        ):
+            self.update(time, high, low, close, volume)
+        return len(candles)
+
+    def values(self) -> IndicatorValues | None:
+        if self.time is None or self.close is None:
+            return None
+        return IndicatorValues(
+            time=datetime.datetime.fromtimestamp(self.time, datetime.timezone.utc),
+            close=self.close,
+            ema_fast=self.ema_fast.value,
+            ema_slow=self.ema_slow.value,
+            rsi=self.rsi.value,
+            atr=self.atr.value,
+            vwap=self.vwap.value,
+            bollinger_middle=self.bollinger.middle,
+            bollinger_upper=self.bollinger.upper,
+            bollinger_lower=self.bollinger.lower,
+        )
+
+
+class IndicatorEngine:
+    def __init__(self, interval: str = "1min") -> None:
+        self.interval = interval
+        self.sets: dict[str, IndicatorSet] = {}
+
+    def refresh(self, tickers: list[str]) -> None:
+        for ticker in tickers:
+            indicator_set = self.sets.setdefault(ticker, IndicatorSet())
+            since = None
+            if indicator_set.time is not None:
+                since = datetime.datetime.fromtimestamp(
+                    indicator_set.time + 1, datetime.timezone.utc
+                )
+            added = indicator_set.feed(store.read(ticker, self.interval, from_=since))
+            if added:
+                logger.debug(f"Indicators for {ticker} updated with {added} bars")
+
+    def get(self, ticker: str) -> IndicatorValues | None:
+        indicator_set = self.sets.get(ticker)
+        return indicator_set.values() if indicator_set else None
+
+
+indicators = IndicatorEngine()
+
+
+async def update_indicators() -> None:
+    # a sharded worker only needs the indicators of its own tickers
+    only = shard.held if config.SHARDING else None
+    tickers = await sync_strategy_candles(indicators.interval, only)
+    indicators.refresh(tickers)
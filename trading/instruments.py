@@ -0,0 +1,104 @@
+import hashlib
+import heapq
+import time
+from collections import Counter
+
+from tinkoff.invest import Share
+
+EXCHANGES = ["MOEX", "MOEX_EVENING_WEEKEND"]
+NAME_WEIGHT = 0.9  # a ticker matching as well as a name ranks first
+
+
+def trigrams(text: str) -> set[str]:
+    grams = set()
+    for word in text.casefold().split():
+        word = f"  {word} "
+        grams.update(word[i : i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+class TickerIndex:
+    """Trigram index over tickers and company names for fuzzy lookups.
+
+    A ticker scores by the Jaccard similarity of its trigrams with the
+    query's, a name by the share of the query's trigrams it contains, so
+    a word typed from a long name still finds it.
+    """
+
+    def __init__(self, shares: list[Share]) -> None:
+        self.shares = shares
+        self.by_ticker = {share.ticker.casefold(): i for i, share in enumerate(shares)}
+        self.ticker_sizes: list[int] = []
+        self.tickers: dict[str, list[int]] = {}
+        self.names: dict[str, list[int]] = {}
+        for i, share in enumerate(shares):
+            grams = trigrams(share.ticker)
+            self.ticker_sizes.append(len(grams))
+            for gram in grams:
+                self.tickers.setdefault(gram, []).append(i)
+            for gram in trigrams(share.name):
+                self.names.setdefault(gram, []).append(i)
+
+    def search(self, query: str, limit: int = 5) -> list[Share]:
+        grams = trigrams(query)
+        if not grams:
+            return []
+        ticker_hits: Counter[int] = Counter()
+        name_hits: Counter[int] = Counter()
+        for gram in grams:
+            ticker_hits.update(self.tickers.get(gram, ()))
+            name_hits.update(self.names.get(gram, ()))
+
+        scores: dict[int, float] = {}
+        for i, common in ticker_hits.items():
+            scores[i] = common / (len(grams) + self.ticker_sizes[i] - common)
+        for i, common in name_hits.items():
+            scores[i] = max(scores.get(i, 0), NAME_WEIGHT * common / len(grams))
+        exact = self.by_ticker.get(query.strip().casefold())
+        if exact is not None:
+            scores[exact] = 2.0
+
+        best = heapq.nlargest(limit, scores, key=scores.__getitem__)
+        return [self.shares[i] for i in best]
+
+
+class InstrumentCatalog:
+    """Process-wide share list with ticker and figi indexes."""
+
+    def __init__(self, ttl: float = 600) -> None:
+        self.ttl = ttl
+        self.shares: list[Share] = []
+        self.by_ticker: dict[str, Share] = {}
+        self.by_figi: dict[str, Share] = {}
+        self.index = TickerIndex([])
+        self.version = ""
+        self.updated_at = 0.0
+
+    @property
+    def is_stale(self) -> bool:
+        return not self.shares or time.monotonic() - self.updated_at > self.ttl
+
+    def update(self, shares: list[Share]) -> bool:
+        shares = [share for share in shares if share.exchange in EXCHANGES]
+        digest = hashlib.sha1()
+        for share in shares:
+            digest.update(
+                f"{share.figi}|{share.ticker}|{share.name}|{share.lot}\n".encode()
+            )
+        version = digest.hexdigest()
+        changed = version != self.version
+
+        self.shares = shares
+        self.by_ticker = {share.ticker: share for share in shares}
+        self.by_figi = {share.figi: share for share in shares}
+        if changed:
+            self.index = TickerIndex(shares)
+        self.version = version
+        self.updated_at = time.monotonic()
+        return changed
+
+    def search(self, query: str, limit: int = 5) -> list[Share]:
+        return self.index.search(query, limit)
+
+
+catalog = InstrumentCatalog()
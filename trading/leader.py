@@ -0,0 +1,118 @@
+import asyncio
+import os
+import socket
+import time
+from typing import Awaitable, Callable
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from bus import bus
+from config import Config
+
+config = Config()  # type: ignore
+
+LEADER_KEY = "trading:leader"
+TOKEN_KEY = "trading:leader:token"
+
+# returns the fencing token of our term, a new one when the lease was free
+# and 0 when another engine leads
+ACQUIRE = """
+local owner = redis.call('GET', KEYS[1])
+if owner == false then
+    local token = redis.call('INCR', KEYS[2])
+    redis.call('SET', KEYS[1], ARGV[1] .. '|' .. token, 'PX', ARGV[2])
+    return token
+end
+local id, token = string.match(owner, '^(.*)|(%d+)$')
+if id == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return tonumber(token)
+end
+return 0
+"""
+RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class Leadership:
+    """One leading engine among hot standbys, elected with a Redis lease.
+
+    Every term gets a fencing token from a counter that only grows. An
+    engine that stalled past its lease and was replaced finds its token
+    gone in ``fence()`` and must not touch the broker any more.
+    """
+
+    def __init__(self, redis: Redis, lease: float) -> None:
+        self.redis = redis
+        self.lease = lease
+        self.engine_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.token = 0
+        self.renewed_at = 0.0
+        self.acquire = redis.register_script(ACQUIRE)
+        self.release = redis.register_script(RELEASE)
+        self.on_elected: Callable[[], Awaitable] | None = None
+        self.task: asyncio.Task | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        # without a renewal within the lease another engine may lead already
+        return self.token > 0 and time.monotonic() - self.renewed_at < self.lease
+
+    @property
+    def owner(self) -> str:
+        return f"{self.engine_id}|{self.token}"
+
+    async def start(self) -> None:
+        await self.renew()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.token:
+            await self.release(keys=[LEADER_KEY], args=[self.owner])
+            self.token = 0
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await self.renew()
+            except Exception as e:
+                logger.error(f"Leader lease renewal failed: {e}")
+
+    async def renew(self) -> None:
+        started = time.monotonic()
+        token = int(
+            await self.acquire(
+                keys=[LEADER_KEY, TOKEN_KEY],
+                args=[self.engine_id, int(self.lease * 1000)],
+            )
+        )
+        if not token:
+            if self.token:
+                logger.warning(f"Lost leadership, token {self.token}")
+            self.token = 0
+            return
+        self.renewed_at = started
+        if token != self.token:
+            self.token = token
+            logger.info(f"Elected as the leader, token {token}")
+            if self.on_elected is not None:
+                asyncio.create_task(self.on_elected())
+
+    async def fence(self) -> None:
+        """Raises unless this engine still holds the current term."""
+        if self.token and await self.redis.get(LEADER_KEY) == self.owner:
+            return
+        self.token = 0
+        raise ValueError("Not the leader, refusing to trade")
+
+
+leadership = Leadership(bus.redis, config.LEADER_LEASE_SECONDS)
@@ -0,0 +1,137 @@
+import threading
+from dataclasses import dataclass
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from db.models import ShareStrategy
+from db.strategies import apply_free_capital
+from .orders import Direction
+from .price import Price
+
+Key = tuple[int, str]  # (strategy, ticker)
+
+
+@dataclass
+class _Pending:
+    absolute: int | None = None
+    delta: int = 0
+
+
+@dataclass
+class _Account:
+    free: int = 0
+    reserved: int = 0
+
+
+class CapitalLedger:
+    """In-memory free capital per (strategy, ticker), persisted as batched deltas."""
+
+    def __init__(self) -> None:
+        self.accounts: dict[Key, _Account] = {}
+        self.pending: dict[Key, _Pending] = {}
+        self.lock = threading.Lock()
+
+    def load(self, strategy: ShareStrategy, force: bool = False) -> None:
+        key: Key = (int(strategy.strategy), str(strategy.ticker))  # type: ignore
+        with self.lock:
+            if key in self.accounts and not force:
+                return
+            free = Price.from_float(float(strategy.free_capital or 0)).value  # type: ignore
+            pending = self.pending.get(key)
+            if pending is not None:
+                if pending.absolute is not None:
+                    free = pending.absolute
+                free += pending.delta
+            self.accounts[key] = _Account(free=free)
+            logger.debug(f"Ledger loaded {key}: {Price(free)}")
+
+    def forget(self, key: Key) -> None:
+        with self.lock:
+            self.accounts.pop(key, None)
+            self.pending.pop(key, None)
+
+    def free(self, key: Key) -> Price:
+        account = self.accounts.get(key)
+        return Price(account.free) if account else Price(0)
+
+    def reserved(self, key: Key) -> Price:
+        account = self.accounts.get(key)
+        return Price(account.reserved) if account else Price(0)
+
+    def set(self, key: Key, amount: Price) -> None:
+        with self.lock:
+            account = self.accounts.setdefault(key, _Account())
+            account.free = amount.value
+            account.reserved = 0
+            self.pending[key] = _Pending(absolute=amount.value)
+
+    def reserve(self, key: Key, amount: Price) -> bool:
+        with self.lock:
+            account = self.accounts.get(key)
+            if account is None:
+                raise ValueError(f"Ledger account {key} is not loaded")
+            if amount.value > account.free:
+                return False
+            account.free -= amount.value
+            account.reserved += amount.value
+            self._add_delta(key, -amount.value)
+            return True
+
+    def release(self, key: Key, amount: Price) -> None:
+        with self.lock:
+            account = self.accounts.get(key)
+            if account is not None:
+                account.reserved = max(account.reserved - amount.value, 0)
+                account.free += amount.value
+            # unloaded accounts pick the delta up in load()
+            self._add_delta(key, amount.value)
+
+    def settle(self, key: Key, direction: Direction, amount: Price) -> None:
+        with self.lock:
+            account = self.accounts.get(key)
+            if direction == Direction.BUY:
+                # reserved money is now held as shares
+                if account is not None:
+                    account.reserved = max(account.reserved - amount.value, 0)
+            elif direction == Direction.SELL:
+                if account is not None:
+                    account.free += amount.value
+                self._add_delta(key, amount.value)
+            else:
+                raise ValueError(f"Invalid direction: {direction}")
+
+    def _add_delta(self, key: Key, value: int) -> None:
+        self.pending.setdefault(key, _Pending()).delta += value
+
+    def flush(self, session: Session) -> None:
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        try:
+            apply_free_capital(
+                session,
+                {
+                    key: (
+                        None if p.absolute is None else Price(p.absolute).amount,
+                        Price(p.delta).amount,
+                    )
+                    for key, p in pending.items()
+                },
+            )
+        except Exception:
+            session.rollback()
+            with self.lock:
+                for key, p in pending.items():
+                    newer = self.pending.get(key)
+                    if newer is None:
+                        self.pending[key] = p
+                    elif newer.absolute is None:
+                        newer.absolute = p.absolute
+                        newer.delta += p.delta
+            raise
+        logger.debug(f"Ledger flushed {len(pending)} accounts")
+
+
+ledger = CapitalLedger()
@@ -0,0 +1,111 @@
+import time
+
+import grpc
+from loguru import logger
+from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client.core import CounterMetricFamily
+from prometheus_client.registry import REGISTRY
+
+from .singleflight import flights
+from .tracing import tracer
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+RPC_CALLS = Counter("invest_rpc_calls_total", "Broker RPC calls", ["method"])
+RPC_ERRORS = Counter(
+    "invest_rpc_errors_total", "Failed broker RPC calls", ["method", "code"]
+)
+RPC_LATENCY = Histogram(
+    "invest_rpc_latency_seconds",
+    "Broker RPC latency",
+    ["method"],
+    buckets=LATENCY_BUCKETS,
+)
+RPC_BYTES = Counter(
+    "invest_rpc_received_bytes_total", "Serialized size of RPC responses", ["method"]
+)
+
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of a timer callback past its due time",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total", "Callbacks that held the event loop too long"
+)
+
+# label children cached per method, .labels() is the costly part of a sample
+_children: dict[str, tuple] = {}
+
+
+def record_rpc(
+    method: str, duration: float, error: str | None = None, size: int = 0
+) -> None:
+    children = _children.get(method)
+    if children is None:
+        children = (
+            RPC_CALLS.labels(method),
+            RPC_LATENCY.labels(method),
+            RPC_BYTES.labels(method),
+        )
+        _children[method] = children
+    calls, latency, received = children
+    calls.inc()
+    latency.observe(duration)
+    if size:
+        received.inc(size)
+    if error is not None:
+        RPC_ERRORS.labels(method, error).inc()
+    tracer.record("rpc", method, duration, error)
+
+
+def error_code(error: grpc.aio.AioRpcError) -> str:
+    # the broker puts its numeric error code into the status details
+    details = error.details() or ""
+    return details if details.isdigit() else error.code().name
+
+
+class MetricsInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = client_call_details.method
+        if isinstance(method, bytes):
+            method = method.decode()
+        method = method.rsplit("/", 1)[-1]
+        started = time.perf_counter()
+        try:
+            call = await continuation(client_call_details, request)
+            response = await call
+        except grpc.aio.AioRpcError as e:
+            record_rpc(method, time.perf_counter() - started, error_code(e))
+            raise
+        record_rpc(method, time.perf_counter() - started, size=response.ByteSize())
+        # the call, not the response, keeps the metadata the SDK reads
+        # (tracking id, rate limits); awaiting it again returns the response
+        return call
+
+
+class SingleFlightCollector:
+    def collect(self):
+        hits = CounterMetricFamily(
+            "invest_single_flight_hits",
+            "Calls served by an in-flight call",
+            labels=["method"],
+        )
+        misses = CounterMetricFamily(
+            "invest_single_flight_misses",
+            "Calls that issued a request",
+            labels=["method"],
+        )
+        for method, (hit, miss) in flights.report().items():
+            hits.add_metric([method], hit)
+            misses.add_metric([method], miss)
+        yield hits
+        yield misses
+
+
+REGISTRY.register(SingleFlightCollector())
+
+
+def start_metrics_server(port: int) -> None:
+    start_http_server(port)
+    logger.info(f"Metrics are served on :{port}/metrics")
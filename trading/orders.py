@@ -3,6 +3,8 @@ from enum import Enum
 from typing import Any, Union, overload
 from tinkoff.invest import Quotation as TinkoffQuotation, OrderDirection
 
+from .price import Price, to_price
+
 
 class Direction(Enum):
     UNKNOWN = 0
@@ -53,19 +55,17 @@ class Order:
 
 
 class LimitOrder(Order):
-    price: "Quotation"
+    price: Price
 
     def __init__(
         self,
         ticker: str,
         lots: int,
         direction: Union[Direction, str],
-        price: Union["Quotation", int, float],
+        price: Union[Price, TinkoffQuotation, int, float],
     ) -> None:
         super().__init__(ticker, lots, direction)
-        if isinstance(price, (int, float)):
-            price = Quotation(price)
-        self.price = price
+        self.price = to_price(price)
 
     def __str__(self) -> str:
         return (
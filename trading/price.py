@@ -0,0 +1,183 @@
+from fractions import Fraction
+from typing import Protocol, Union
+
+from tinkoff.invest import MoneyValue, Quotation as TinkoffQuotation
+
+NANO = 1_000_000_000
+
+
+class _UnitsNano(Protocol):
+    units: int
+    nano: int
+
+
+Scalar = Union[int, float, Fraction]
+
+
+def _ratio(other: Scalar) -> tuple[int, int]:
+    if type(other) is int:
+        return other, 1
+    if isinstance(other, (float, Fraction)):
+        return other.as_integer_ratio()
+    return NotImplemented  # type: ignore
+
+
+def _div_round(num: int, den: int) -> int:
+    # integer division rounded half away from zero
+    if den < 0:
+        num, den = -num, -den
+    q, r = divmod(abs(num), den)
+    if 2 * r >= den:
+        q += 1
+    return q if num >= 0 else -q
+
+
+class Price:
+    """Fixed-point price stored as a single integer amount of nanos."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: int = 0) -> None:
+        self.value = value
+
+    @classmethod
+    def from_units(cls, units: int, nano: int) -> "Price":
+        return cls(units * NANO + nano)
+
+    @classmethod
+    def from_quotation(cls, quotation: _UnitsNano) -> "Price":
+        # works for both Quotation and MoneyValue
+        return cls(quotation.units * NANO + quotation.nano)
+
+    @classmethod
+    def from_float(cls, amount: float | int) -> "Price":
+        return cls(round(amount * NANO))
+
+    @classmethod
+    def from_bignum(cls, bignum: int | float) -> "Price":
+        return cls(int(bignum))
+
+    @property
+    def units(self) -> int:
+        if self.value < 0:
+            return -(-self.value // NANO)
+        return self.value // NANO
+
+    @property
+    def nano(self) -> int:
+        return self.value - self.units * NANO
+
+    @property
+    def amount(self) -> float:
+        return self.value / NANO
+
+    def to_float(self) -> float:
+        return self.value / NANO
+
+    def to_bignum(self) -> int:
+        return self.value
+
+    def to_quotation(self) -> TinkoffQuotation:
+        units = self.units
+        return TinkoffQuotation(units=units, nano=self.value - units * NANO)
+
+    def to_money_value(self, currency: str = "rub") -> MoneyValue:
+        units = self.units
+        return MoneyValue(
+            currency=currency, units=units, nano=self.value - units * NANO
+        )
+
+    def round_to(self, increment: "Price") -> "Price":
+        step = increment.value
+        if step <= 0:
+            return self
+        return Price(_div_round(self.value, step) * step)
+
+    def __str__(self) -> str:
+        sign = "-" if self.value < 0 else ""
+        units, nano = divmod(abs(self.value), NANO)
+        return f"{sign}{units}.{nano:09d}"
+
+    def __repr__(self) -> str:
+        return f"Price({self})"
+
+    def __float__(self) -> float:
+        return self.value / NANO
+
+    def __int__(self) -> int:
+        return self.units
+
+    def __bool__(self) -> bool:
+        return self.value != 0
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+    def __add__(self, other: "Price") -> "Price":
+        if type(other) is not Price:
+            return NotImplemented
+        return Price(self.value + other.value)
+
+    def __sub__(self, other: "Price") -> "Price":
+        if type(other) is not Price:
+            return NotImplemented
+        return Price(self.value - other.value)
+
+    def __neg__(self) -> "Price":
+        return Price(-self.value)
+
+    def __mul__(self, other: Scalar) -> "Price":
+        if type(other) is int:
+            return Price(self.value * other)
+        ratio = _ratio(other)
+        if ratio is NotImplemented:
+            return NotImplemented
+        return Price(_div_round(self.value * ratio[0], ratio[1]))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Scalar) -> "Price":
+        ratio = _ratio(other)
+        if ratio is NotImplemented:
+            return NotImplemented
+        if ratio[0] == 0:
+            raise ZeroDivisionError("Price division by zero")
+        return Price(_div_round(self.value * ratio[1], ratio[0]))
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not Price:
+            return NotImplemented
+        return self.value == other.value  # type: ignore
+
+    def __ne__(self, other: object) -> bool:
+        if type(other) is not Price:
+            return NotImplemented
+        return self.value != other.value  # type: ignore
+
+    def __lt__(self, other: "Price") -> bool:
+        if type(other) is not Price:
+            return NotImplemented
+        return self.value < other.value
+
+    def __le__(self, other: "Price") -> bool:
+        if type(other) is not Price:
+            return NotImplemented
+        return self.value <= other.value
+
+    def __gt__(self, other: "Price") -> bool:
+        if type(other) is not Price:
+            return NotImplemented
+        return self.value > other.value
+
+    def __ge__(self, other: "Price") -> bool:
+        if type(other) is not Price:
+            return NotImplemented
+        return self.value >= other.value
+
+
+def to_price(value: "Price | _UnitsNano | int | float") -> Price:
+    if type(value) is Price:
+        return value  # type: ignore
+    if isinstance(value, (int, float)):
+        return Price.from_float(value)
+    return Price.from_quotation(value)  # type: ignore
@@ -0,0 +1,72 @@
+import datetime
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from db.orders import Order as DBOrder
+from .price import Price
+
+
+def utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def day_start() -> datetime.datetime:
+    return utcnow().replace(hour=1, minute=0, second=0, microsecond=0)
+
+
+def local_to_utc(moment: datetime.datetime) -> datetime.datetime:
+    # naive local time, as the orders table stores it
+    return moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def utc_to_local(moment: datetime.datetime) -> datetime.datetime:
+    return (
+        moment.replace(tzinfo=datetime.timezone.utc).astimezone().replace(tzinfo=None)
+    )
+
+
+class ReferencePrices:
+    """Executed price of the latest limit fill per figi."""
+
+    def __init__(self) -> None:
+        # naive UTC, compared with day_start()
+        self.prices: dict[str, tuple[Price, datetime.datetime]] = {}
+        self.loaded = False
+
+    def load(self, session: Session) -> None:
+        fills = (
+            session.query(DBOrder)
+            .filter(
+                (DBOrder.status == "fill")
+                & (DBOrder.type == "ORDER_TYPE_LIMIT")
+                & (DBOrder.updated_at > utc_to_local(day_start()))
+            )
+            .order_by(DBOrder.updated_at.asc())
+            .all()
+        )
+        for order in fills:
+            if order.avg_price_units is not None:
+                price = Price.from_units(
+                    int(order.avg_price_units), int(order.avg_price_nanos or 0)  # type: ignore
+                )
+            else:
+                price = Price.from_units(
+                    int(order.price_units), int(order.price_nanos)  # type: ignore
+                )
+            updated_at = local_to_utc(order.updated_at)  # type: ignore
+            self.prices[str(order.figi)] = (price, updated_at)
+        self.loaded = True
+        logger.debug(f"Loaded reference prices for {len(self.prices)} instruments")
+
+    def update(self, figi: str, price: Price) -> None:
+        self.prices[figi] = (price, utcnow())
+
+    def get(self, figi: str) -> Price | None:
+        entry = self.prices.get(figi)
+        if entry is None or entry[1] <= day_start():
+            return None
+        return entry[0]
+
+
+reference_prices = ReferencePrices()
@@ -0,0 +1,132 @@
+import datetime
+import time
+from zoneinfo import ZoneInfo
+
+from loguru import logger
+from tinkoff.invest import (
+    GetTradingStatusResponse,
+    SecurityTradingStatus,
+    Share,
+    TradingSchedule,
+)
+
+from config import Config
+
+config = Config()  # type: ignore
+
+MOSCOW = ZoneInfo("Europe/Moscow")
+DAYS_AHEAD = 7
+RETRY_AFTER = 600  # seconds before retrying a failed refresh
+TRADABLE_STATUSES = (
+    SecurityTradingStatus.SECURITY_TRADING_STATUS_NORMAL_TRADING,
+    SecurityTradingStatus.SECURITY_TRADING_STATUS_DEALER_NORMAL_TRADING,
+)
+
+Session = tuple[datetime.datetime, datetime.datetime]
+
+
+def _is_set(value: datetime.datetime | None) -> bool:
+    # unset timestamps come back as the epoch
+    return value is not None and value.timestamp() > 0
+
+
+def day_sessions(day) -> list[Session]:
+    """Open intervals of a ``TradingDay`` with the clearing breaks cut out."""
+    if not day.is_trading_day:
+        return []
+    sessions: list[Session] = []
+    if _is_set(day.start_time) and _is_set(day.end_time):
+        sessions.append((day.start_time, day.end_time))
+    if _is_set(day.evening_start_time) and _is_set(day.evening_end_time):
+        sessions.append((day.evening_start_time, day.evening_end_time))
+    if _is_set(day.clearing_start_time) and _is_set(day.clearing_end_time):
+        clearing = (day.clearing_start_time, day.clearing_end_time)
+        split: list[Session] = []
+        for start, end in sessions:
+            if clearing[0] < end and clearing[1] > start:
+                if start < clearing[0]:
+                    split.append((start, clearing[0]))
+                if clearing[1] < end:
+                    split.append((clearing[1], end))
+            else:
+                split.append((start, end))
+        sessions = split
+    return sorted(sessions)
+
+
+class TradingCalendar:
+    """Trading sessions per exchange from ``instruments.trading_schedules``."""
+
+    def __init__(self) -> None:
+        self.sessions: dict[str, dict[datetime.date, list[Session]]] = {}
+        self.updated_on: datetime.date | None = None
+        self.failed_at = 0.0
+        # halts and auctions are not in the schedule, so the status of an
+        # instrument is fetched live and kept only for a few seconds
+        self.statuses: dict[str, tuple[GetTradingStatusResponse, float]] = {}
+
+    @property
+    def is_stale(self) -> bool:
+        if time.monotonic() - self.failed_at < RETRY_AFTER:
+            return False
+        return self.updated_on != datetime.datetime.now(MOSCOW).date()
+
+    def update(self, schedules: list[TradingSchedule]) -> None:
+        sessions: dict[str, dict[datetime.date, list[Session]]] = {}
+        for schedule in schedules:
+            days = sessions.setdefault(schedule.exchange, {})
+            for day in schedule.days:
+                days[day.date.astimezone(MOSCOW).date()] = day_sessions(day)
+        self.sessions = sessions
+        self.updated_on = datetime.datetime.now(MOSCOW).date()
+        logger.info(f"Trading calendar updated for {len(sessions)} exchanges")
+
+    def fail(self) -> None:
+        self.failed_at = time.monotonic()
+
+    def cached_status(self, figi: str) -> GetTradingStatusResponse | None:
+        entry = self.statuses.get(figi)
+        if entry is None or time.monotonic() - entry[1] > config.TRADING_STATUS_TTL:
+            return None
+        return entry[0]
+
+    def store_status(self, figi: str, status: GetTradingStatusResponse) -> None:
+        self.statuses[figi] = (status, time.monotonic())
+
+    def is_open(self, exchange: str, now: datetime.datetime | None = None) -> bool:
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        days = self.sessions.get(exchange, {})
+        local = now.astimezone(MOSCOW)
+        if local.date() not in days:
+            # no schedule for this exchange, fall back to the static hours
+            return local.weekday() < 5 and local.hour in config.MOEX_WORKING_HOURS
+        # sessions are keyed by their trading date, which may differ from now's
+        dates = [local.date() + datetime.timedelta(days=i) for i in (-1, 0, 1)]
+        return any(
+            start <= now < end for date in dates for start, end in days.get(date, [])
+        )
+
+    def next_open(
+        self, exchange: str, now: datetime.datetime | None = None
+    ) -> datetime.datetime | None:
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        for date in sorted(self.sessions.get(exchange, {})):
+            for start, end in self.sessions[exchange][date]:
+                if end > now:
+                    return max(start, now)
+        return None
+
+    def is_tradable(
+        self,
+        share: Share,
+        status: GetTradingStatusResponse,
+        now: datetime.datetime | None = None,
+    ) -> bool:
+        if not share.api_trade_available_flag:
+            return False
+        if status.trading_status not in TRADABLE_STATUSES:
+            return False
+        return self.is_open(share.exchange, now)
+
+
+calendar = TradingCalendar()
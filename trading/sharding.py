@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import os
+import socket
+from bisect import bisect
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from bus import bus
+from config import Config
+
+config = Config()  # type: ignore
+
+WORKERS_KEY = "trading:workers:"
+TICKERS_KEY = "trading:tickers:"
+REPLICAS = 64  # points per worker on the ring
+
+# take the lease if it is free, extend it if it is ours
+ACQUIRE = """
+local owner = redis.call('GET', KEYS[1])
+if owner == false then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+if owner == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hashing, a worker joining or leaving moves ~1/N of the keys."""
+
+    def __init__(self, nodes: list[str], replicas: int = REPLICAS) -> None:
+        points = sorted(
+            (_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas)
+        )
+        self.hashes = [h for h, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def owner(self, key: str) -> str:
+        if not self.nodes:
+            raise ValueError("No workers in the ring")
+        return self.nodes[bisect(self.hashes, _hash(key)) % len(self.nodes)]
+
+
+class Shard:
+    """Tickers of this worker, coordinated with the other workers in Redis.
+
+    A worker is alive while its lease key exists. Tickers are spread over
+    the alive workers by consistent hashing, and a worker trades a ticker
+    only after taking the ticker's lease, so during a rebalance the new
+    owner waits until the old one has released the ticker or died.
+    """
+
+    def __init__(self, redis: Redis, lease: float) -> None:
+        self.redis = redis
+        self.lease_ms = int(lease * 1000)
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.held: set[str] = set()
+        self.acquired: set[str] = set()  # held since the last claim
+        self.workers: list[str] = []
+        self.ring = HashRing([])
+        self.acquire = redis.register_script(ACQUIRE)
+        self.release = redis.register_script(RELEASE)
+        self.task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        await self.heartbeat()
+        self.task = asyncio.create_task(self.run())
+        logger.info(f"Worker {self.worker_id} joined the shard ring")
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.release_tickers(self.held)
+        await self.redis.delete(WORKERS_KEY + self.worker_id)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_ms / 3000)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.error(f"Shard heartbeat failed: {e}")
+
+    async def heartbeat(self) -> None:
+        await self.redis.set(WORKERS_KEY + self.worker_id, "1", px=self.lease_ms)
+        if self.held:
+            # a ticker stays leased between ticks
+            lost = self.held - await self.acquire_tickers(self.held)
+            if lost:
+                logger.warning(f"Lost the leases of {', '.join(sorted(lost))}")
+                self.held -= lost
+
+    async def alive_workers(self) -> list[str]:
+        workers = [
+            key.removeprefix(WORKERS_KEY)
+            async for key in self.redis.scan_iter(match=WORKERS_KEY + "*")
+        ]
+        return sorted(set(workers) | {self.worker_id})
+
+    async def acquire_tickers(self, tickers: set[str]) -> set[str]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for ticker in tickers:
+                await self.acquire(
+                    keys=[TICKERS_KEY + ticker],
+                    args=[self.worker_id, self.lease_ms],
+                    client=pipe,
+                )
+            results = await pipe.execute()
+        return {ticker for ticker, ok in zip(tickers, results) if ok}
+
+    async def release_tickers(self, tickers: set[str]) -> None:
+        if not tickers:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for ticker in tickers:
+                await self.release(
+                    keys=[TICKERS_KEY + ticker], args=[self.worker_id], client=pipe
+                )
+            await pipe.execute()
+
+    def owns(self, key: str) -> bool:
+        """Whether this worker owns ``key`` on the ring of the last claim."""
+        return bool(self.workers) and self.ring.owner(key) == self.worker_id
+
+    async def claim(self, tickers: list[str]) -> set[str]:
+        """Tickers of ``tickers`` this worker should trade now."""
+        workers = await self.alive_workers()
+        if workers != self.workers:
+            logger.info(f"Shard ring changed: {len(workers)} workers")
+            self.workers = workers
+            self.ring = HashRing(workers)
+        mine = {t for t in tickers if self.ring.owner(t) == self.worker_id}
+        await self.release_tickers(self.held - mine)
+        held = await self.acquire_tickers(mine)
+        if held != self.held:
+            waiting = len(mine) - len(held)
+            logger.info(
+                f"Worker {self.worker_id} holds {len(held)} of {len(tickers)} tickers"
+                + (f", {waiting} still leased by other workers" if waiting else "")
+            )
+        self.acquired = held - self.held
+        self.held = held
+        return held
+
+
+shard = Shard(bus.redis, config.SHARD_LEASE_SECONDS)
@@ -0,0 +1,8 @@
+from .exchange import (
+    Exchange,
+    Scenario,
+    InstrumentScenario,
+    get_exchange,
+    reset_exchange,
+)
+from .services import SimulatedClient, SimulatedServices
@@ -0,0 +1,117 @@
+import heapq
+import itertools
+from dataclasses import dataclass, field
+
+from ..orders import Direction
+
+
+@dataclass
+class RestingOrder:
+    order_id: str
+    figi: str
+    direction: Direction
+    price: int  # nanos
+    quantity: int  # shares
+    executed: int = 0
+    cost: int = 0  # nanos paid/received for executed shares
+    cancelled: bool = False
+    seq: int = 0
+
+    @property
+    def remaining(self) -> int:
+        return self.quantity - self.executed
+
+    @property
+    def is_active(self) -> bool:
+        return not self.cancelled and self.remaining > 0
+
+
+@dataclass
+class Fill:
+    order: RestingOrder
+    quantity: int
+    price: int
+
+
+@dataclass
+class OrderBook:
+    """Price-time priority limit order book for a single instrument."""
+
+    figi: str
+    bids: list = field(default_factory=list)  # (-price, seq, order)
+    asks: list = field(default_factory=list)  # (price, seq, order)
+    counter: itertools.count = field(default_factory=itertools.count)
+
+    def add(self, order: RestingOrder) -> list[Fill]:
+        fills = self.match(order)
+        self.rest(order)
+        return fills
+
+    def match(self, order: RestingOrder) -> list[Fill]:
+        order.seq = next(self.counter)
+        return self._match(order)
+
+    def rest(self, order: RestingOrder) -> None:
+        if not order.is_active:
+            return
+        if order.direction == Direction.BUY:
+            heapq.heappush(self.bids, (-order.price, order.seq, order))
+        else:
+            heapq.heappush(self.asks, (order.price, order.seq, order))
+
+    def cancel(self, order: RestingOrder) -> None:
+        # lazy deletion, dropped when it reaches the top of the heap
+        order.cancelled = True
+
+    def best_bid(self) -> RestingOrder | None:
+        self._prune(self.bids)
+        return self.bids[0][2] if self.bids else None
+
+    def best_ask(self) -> RestingOrder | None:
+        self._prune(self.asks)
+        return self.asks[0][2] if self.asks else None
+
+    def cross(self, price: int) -> list[Fill]:
+        """Fill resting orders that a market print at ``price`` trades through."""
+        fills: list[Fill] = []
+        while (bid := self.best_bid()) is not None and bid.price >= price:
+            fills.append(self.execute(bid, bid.remaining, bid.price))
+            heapq.heappop(self.bids)
+        while (ask := self.best_ask()) is not None and ask.price <= price:
+            fills.append(self.execute(ask, ask.remaining, ask.price))
+            heapq.heappop(self.asks)
+        return fills
+
+    def open_orders(self) -> list[RestingOrder]:
+        return [o for _, _, o in self.bids + self.asks if o.is_active]
+
+    def _match(self, order: RestingOrder) -> list[Fill]:
+        fills: list[Fill] = []
+        if order.direction == Direction.BUY:
+            heap = self.asks
+            crosses = lambda other: other.price <= order.price  # noqa: E731
+        else:
+            heap = self.bids
+            crosses = lambda other: other.price >= order.price  # noqa: E731
+        while order.remaining > 0:
+            self._prune(heap)
+            if not heap or not crosses(heap[0][2]):
+                break
+            other = heap[0][2]
+            quantity = min(order.remaining, other.remaining)
+            fills.append(self.execute(other, quantity, other.price))
+            fills.append(self.execute(order, quantity, other.price))
+            if not other.is_active:
+                heapq.heappop(heap)
+        return fills
+
+    @staticmethod
+    def execute(order: RestingOrder, quantity: int, price: int) -> Fill:
+        order.executed += quantity
+        order.cost += quantity * price
+        return Fill(order, quantity, price)
+
+    @staticmethod
+    def _prune(heap: list) -> None:
+        while heap and not heap[0][2].is_active:
+            heapq.heappop(heap)
@@ -0,0 +1,403 @@
+import datetime
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass, field
+
+from loguru import logger
+from tinkoff.invest import (
+    OperationType,
+    OrderExecutionReportStatus as ExecutionStatus,
+    OrderType,
+)
+
+from ..orders import Direction
+from ..price import Price
+from .book import Fill, OrderBook, RestingOrder
+from .types import SimAccount, SimOperation, SimShare
+
+ACCOUNT_ID = "sim-account"
+
+
+@dataclass
+class InstrumentScenario:
+    ticker: str
+    figi: str
+    price: float
+    name: str = ""
+    lot: int = 1
+    min_price_increment: float = 0.01
+    volatility: float = 0.001  # stddev of log return per step
+    drift: float = 0.0
+    path: list[float] = field(default_factory=list)
+    exchange: str = "MOEX"
+    halted: bool = False
+
+
+@dataclass
+class Scenario:
+    instruments: list[InstrumentScenario]
+    seed: int = 0
+    start: datetime.datetime = datetime.datetime(
+        2024, 4, 1, 7, 0, tzinfo=datetime.timezone.utc
+    )
+    step_seconds: float = 60
+    auto_advance: bool = False  # advance by wall clock time between calls
+    latency: float = 0.0  # seconds per call
+    rate_limits: dict[str, int] = field(default_factory=dict)  # calls per minute
+    cash: float = 1_000_000
+    session: list[str] = field(default_factory=lambda: ["00:00", "23:59"])  # UTC
+    holidays: list[str] = field(default_factory=list)  # ISO dates
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Scenario":
+        data = dict(data)
+        data["instruments"] = [
+            InstrumentScenario(**item) for item in data.get("instruments", [])
+        ]
+        if isinstance(data.get("start"), str):
+            data["start"] = datetime.datetime.fromisoformat(data["start"])
+        return cls(**data)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Scenario":
+        with open(path, encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
+
+    @classmethod
+    def default(cls) -> "Scenario":
+        return cls(
+            instruments=[
+                InstrumentScenario(
+                    ticker="SBER",
+                    figi="BBG004730N88",
+                    name="Сбербанк",
+                    lot=10,
+                    price=300.0,
+                ),
+                InstrumentScenario(
+                    ticker="GAZP",
+                    figi="BBG004730RP0",
+                    name="Газпром",
+                    lot=10,
+                    price=160.0,
+                ),
+                InstrumentScenario(
+                    ticker="LKOH",
+                    figi="BBG004731032",
+                    name="ЛУКОЙЛ",
+                    lot=1,
+                    price=7500.0,
+                    min_price_increment=0.5,
+                ),
+            ]
+        )
+
+
+class PricePath:
+    def __init__(self, instrument: InstrumentScenario, seed: int) -> None:
+        self.increment = Price.from_float(instrument.min_price_increment)
+        self.scripted = [
+            Price.from_float(p).round_to(self.increment) for p in instrument.path
+        ]
+        self.position = 0
+        self.rng = random.Random(seed)
+        self.volatility = instrument.volatility
+        self.drift = instrument.drift
+        self.value = (
+            self.scripted[0].value
+            if self.scripted
+            else Price.from_float(instrument.price).round_to(self.increment).value
+        )
+
+    def next(self) -> int:
+        self.position += 1
+        if self.position < len(self.scripted):
+            self.value = self.scripted[self.position].value
+        elif not self.scripted:
+            shock = self.rng.gauss(self.drift, self.volatility)
+            raw = Price(self.value) * (1 + shock)
+            self.value = max(raw.round_to(self.increment), self.increment).value
+        return self.value
+
+
+@dataclass
+class SimOrder:
+    resting: RestingOrder
+    order_type: OrderType
+    lots: int
+    limit: int  # nanos, 0 for market orders
+    reserve: int  # price per share blocked on the account
+    created_at: datetime.datetime
+    request_id: str
+    status: ExecutionStatus = ExecutionStatus.EXECUTION_REPORT_STATUS_NEW
+
+
+class ExchangeError(Exception):
+    def __init__(self, code: str, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class Exchange:
+    def __init__(self, scenario: Scenario) -> None:
+        self.scenario = scenario
+        self.account = SimAccount(id=ACCOUNT_ID, name="Simulator")
+        self.shares: dict[str, SimShare] = {}
+        self.paths: dict[str, PricePath] = {}
+        self.books: dict[str, OrderBook] = {}
+        self.halted: set[str] = set()
+        for index, instrument in enumerate(scenario.instruments):
+            self.shares[instrument.figi] = SimShare(
+                figi=instrument.figi,
+                ticker=instrument.ticker,
+                name=instrument.name or instrument.ticker,
+                lot=instrument.lot,
+                min_price_increment=Price.from_float(
+                    instrument.min_price_increment
+                ).to_quotation(),
+                uid=instrument.figi,
+                exchange=instrument.exchange,
+            )
+            self.paths[instrument.figi] = PricePath(instrument, scenario.seed + index)
+            self.books[instrument.figi] = OrderBook(instrument.figi)
+            if instrument.halted:
+                self.halted.add(instrument.figi)
+
+        self.orders: dict[str, SimOrder] = {}
+        self.request_ids: dict[str, str] = {}
+        self.cash = Price.from_float(scenario.cash).value
+        self.blocked_cash = 0
+        self.positions: dict[str, int] = {}
+        self.blocked_positions: dict[str, int] = {}
+        self.operations: list[SimOperation] = []
+
+        self.limiters: dict = {}
+        self.step = 0
+        self.now = scenario.start
+        # (epoch seconds, price) of every step, source for get_candles
+        self.history: dict[str, tuple[list[int], list[int]]] = {
+            figi: ([int(self.now.timestamp())], [path.value])
+            for figi, path in self.paths.items()
+        }
+        self.ids = itertools.count(1)
+        self.started = time.monotonic()
+
+    # clock and prices
+
+    def advance(self, steps: int = 1) -> list[Fill]:
+        fills: list[Fill] = []
+        for _ in range(steps):
+            self.step += 1
+            self.now += datetime.timedelta(seconds=self.scenario.step_seconds)
+            timestamp = int(self.now.timestamp())
+            for figi, path in self.paths.items():
+                price = path.next()
+                times, prices = self.history[figi]
+                times.append(timestamp)
+                prices.append(price)
+                for fill in self.books[figi].cross(price):
+                    self._settle(fill)
+                    fills.append(fill)
+        return fills
+
+    def sync_clock(self) -> None:
+        if not self.scenario.auto_advance:
+            return
+        elapsed = time.monotonic() - self.started
+        target = int(elapsed / self.scenario.step_seconds)
+        if target > self.step:
+            self.advance(target - self.step)
+
+    def last_price(self, figi: str) -> int:
+        return self.paths[self._share(figi).figi].value
+
+    def is_trading(self, figi: str) -> bool:
+        return figi not in self.halted
+
+    # orders
+
+    def post_order(
+        self,
+        figi: str,
+        order_type: OrderType,
+        direction: Direction,
+        lots: int,
+        price: Price,
+        request_id: str,
+    ) -> SimOrder:
+        if request_id and request_id in self.request_ids:
+            return self.orders[self.request_ids[request_id]]
+        share = self._share(figi)
+        if not self.is_trading(share.figi):
+            raise ExchangeError("30079", f"Instrument {share.ticker} is not trading")
+        if lots <= 0:
+            raise ExchangeError("30005", f"Invalid quantity: {lots}")
+        quantity = lots * share.lot
+        last = self.last_price(share.figi)
+
+        if order_type == OrderType.ORDER_TYPE_LIMIT:
+            increment = Price.from_quotation(share.min_price_increment).value
+            if price.value <= 0 or price.value % increment:
+                raise ExchangeError("30008", f"Invalid price: {price}")
+            limit = price.value
+        elif order_type == OrderType.ORDER_TYPE_MARKET:
+            limit = 0
+        else:
+            raise ExchangeError("30005", f"Invalid order type: {order_type}")
+
+        reserve = limit or last
+        if direction == Direction.BUY:
+            needed = reserve * quantity
+            if needed > self.cash - self.blocked_cash:
+                raise ExchangeError("30034", "Not enough money")
+            self.blocked_cash += needed
+        else:
+            if quantity > self.positions.get(
+                share.figi, 0
+            ) - self.blocked_positions.get(share.figi, 0):
+                raise ExchangeError("30034", "Not enough securities")
+            self.blocked_positions[share.figi] = (
+                self.blocked_positions.get(share.figi, 0) + quantity
+            )
+
+        order_id = f"sim-{next(self.ids)}"
+        book_price = limit
+        if order_type == OrderType.ORDER_TYPE_MARKET:
+            book_price = 2**62 if direction == Direction.BUY else 0
+        resting = RestingOrder(
+            order_id=order_id,
+            figi=share.figi,
+            direction=direction,
+            price=book_price,
+            quantity=quantity,
+        )
+        order = SimOrder(
+            resting=resting,
+            order_type=order_type,
+            lots=lots,
+            limit=limit,
+            reserve=reserve,
+            created_at=self.now,
+            request_id=request_id,
+        )
+        self.orders[order_id] = order
+        if request_id:
+            self.request_ids[request_id] = order_id
+
+        book = self.books[share.figi]
+        for fill in book.match(resting):
+            self._settle(fill)
+        marketable = (direction == Direction.BUY and resting.price >= last) or (
+            direction == Direction.SELL and resting.price <= last
+        )
+        if resting.is_active and marketable:
+            # remaining size trades against outside liquidity at the last price
+            self._settle(book.execute(resting, resting.remaining, last))
+        book.rest(resting)
+        logger.debug(
+            f"Simulator order {order_id}: {direction.name} {quantity} {share.ticker}"
+        )
+        return order
+
+    def cancel_order(self, order_id: str) -> SimOrder:
+        order = self.get_order(order_id)
+        if order.status != ExecutionStatus.EXECUTION_REPORT_STATUS_NEW and (
+            order.status != ExecutionStatus.EXECUTION_REPORT_STATUS_PARTIALLYFILL
+        ):
+            raise ExchangeError("30059", f"Order {order_id} can not be cancelled")
+        resting = order.resting
+        self.books[resting.figi].cancel(resting)
+        self._unblock(order, resting.remaining)
+        order.status = ExecutionStatus.EXECUTION_REPORT_STATUS_CANCELLED
+        return order
+
+    def get_order(self, order_id: str) -> SimOrder:
+        order = self.orders.get(order_id)
+        if order is None:
+            raise ExchangeError("50005", f"Order {order_id} not found")
+        return order
+
+    def active_orders(self) -> list[SimOrder]:
+        return [
+            order
+            for order in self.orders.values()
+            if order.status
+            in (
+                ExecutionStatus.EXECUTION_REPORT_STATUS_NEW,
+                ExecutionStatus.EXECUTION_REPORT_STATUS_PARTIALLYFILL,
+            )
+        ]
+
+    def _settle(self, fill: Fill) -> None:
+        resting = fill.order
+        order = self.orders.get(resting.order_id)
+        if order is None:
+            return
+        amount = fill.quantity * fill.price
+        figi = resting.figi
+        if resting.direction == Direction.BUY:
+            self.blocked_cash = max(
+                self.blocked_cash - order.reserve * fill.quantity, 0
+            )
+            self.cash -= amount
+            self.positions[figi] = self.positions.get(figi, 0) + fill.quantity
+            operation_type = OperationType.OPERATION_TYPE_BUY
+        else:
+            self.blocked_positions[figi] -= fill.quantity
+            self.positions[figi] -= fill.quantity
+            self.cash += amount
+            operation_type = OperationType.OPERATION_TYPE_SELL
+        if resting.remaining == 0:
+            order.status = ExecutionStatus.EXECUTION_REPORT_STATUS_FILL
+        else:
+            order.status = ExecutionStatus.EXECUTION_REPORT_STATUS_PARTIALLYFILL
+        self.operations.append(
+            SimOperation(
+                id=f"op-{len(self.operations) + 1}",
+                figi=figi,
+                date=self.now,
+                operation_type=operation_type,
+                payment=Price(
+                    -amount if resting.direction == Direction.BUY else amount
+                ).to_money_value(),
+                price=Price(fill.price).to_money_value(),
+                quantity=fill.quantity,
+                parent_operation_id=resting.order_id,
+            )
+        )
+
+    def _unblock(self, order: SimOrder, quantity: int) -> None:
+        resting = order.resting
+        if resting.direction == Direction.BUY:
+            self.blocked_cash = max(self.blocked_cash - order.reserve * quantity, 0)
+        else:
+            self.blocked_positions[resting.figi] -= quantity
+
+    def _share(self, figi: str) -> SimShare:
+        share = self.shares.get(figi)
+        if share is None:
+            raise ExchangeError("50002", f"Instrument {figi} not found")
+        return share
+
+
+_exchange: Exchange | None = None
+
+
+def get_exchange(scenario_path: str | None = None) -> Exchange:
+    global _exchange
+    if _exchange is None:
+        scenario = (
+            Scenario.from_file(scenario_path) if scenario_path else Scenario.default()
+        )
+        _exchange = Exchange(scenario)
+        logger.info(f"Simulator started with {len(scenario.instruments)} instruments")
+    return _exchange
+
+
+def reset_exchange(scenario: Scenario | None = None) -> Exchange:
+    global _exchange
+    _exchange = Exchange(scenario or Scenario.default())
+    return _exchange
@@ -0,0 +1,390 @@
+import asyncio
+import datetime
+import functools
+import time
+from bisect import bisect_left
+
+from grpc import StatusCode
+from tinkoff.invest import (
+    AioRequestError,
+    CandleInterval,
+    OrderDirection,
+    OrderType,
+    Quotation,
+    SecurityTradingStatus,
+)
+
+from history.candles import get_interval
+
+from ..metrics import record_rpc
+from ..orders import Direction
+from ..price import Price
+from .exchange import Exchange, ExchangeError, SimOrder
+from .types import (
+    EPOCH,
+    SimCancelOrderResponse,
+    SimCandle,
+    SimLastPrice,
+    SimOrderState,
+    SimPositionsSecurities,
+    SimPostOrderResponse,
+    SimResponse,
+    SimTradingDay,
+    SimTradingSchedule,
+    SimTradingStatus,
+)
+
+
+class RateLimiter:
+    """Token bucket refilled continuously up to ``per_minute`` calls."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def rpc(f):
+    # same method names the grpc interceptor reports
+    method = "".join(part.title() for part in f.__name__.split("_"))
+
+    @functools.wraps(f)
+    async def wrapper(self: "SimulatedService", *args, **kwargs):
+        started = time.perf_counter()
+        limiter = self.limiter
+        if limiter is not None and not limiter.acquire():
+            record_rpc(method, time.perf_counter() - started, "80002")
+            raise AioRequestError(StatusCode.RESOURCE_EXHAUSTED, "80002", None)
+        if self.exchange.scenario.latency:
+            await asyncio.sleep(self.exchange.scenario.latency)
+        self.exchange.sync_clock()
+        try:
+            response = f(self, *args, **kwargs)
+        except ExchangeError as e:
+            record_rpc(method, time.perf_counter() - started, e.code)
+            code = (
+                StatusCode.NOT_FOUND
+                if e.code.startswith("50")
+                else StatusCode.INVALID_ARGUMENT
+            )
+            raise AioRequestError(code, e.code, None) from e
+        record_rpc(method, time.perf_counter() - started)
+        return response
+
+    return wrapper
+
+
+class SimulatedService:
+    name = ""
+
+    def __init__(self, exchange: Exchange) -> None:
+        self.exchange = exchange
+        per_minute = exchange.scenario.rate_limits.get(self.name)
+        self.limiter = None
+        if per_minute:
+            # buckets live on the exchange so they outlive a single client
+            self.limiter = exchange.limiters.setdefault(
+                self.name, RateLimiter(per_minute)
+            )
+
+
+class UsersService(SimulatedService):
+    name = "users"
+
+    @rpc
+    def get_accounts(self):
+        return SimResponse(accounts=[self.exchange.account])
+
+
+class InstrumentsService(SimulatedService):
+    name = "instruments"
+
+    @rpc
+    def shares(self, *args, **kwargs):
+        return SimResponse(instruments=list(self.exchange.shares.values()))
+
+    @rpc
+    def trading_schedules(
+        self,
+        *,
+        exchange: str = "",
+        from_: datetime.datetime,
+        to: datetime.datetime,
+        **kwargs,
+    ):
+        scenario = self.exchange.scenario
+        start, end = (
+            datetime.time.fromisoformat(value).replace(tzinfo=datetime.timezone.utc)
+            for value in scenario.session
+        )
+        exchanges = sorted({share.exchange for share in self.exchange.shares.values()})
+        days: list[SimTradingDay] = []
+        date = from_.date()
+        while date <= to.date():
+            trading = date.isoformat() not in scenario.holidays
+            days.append(
+                SimTradingDay(
+                    date=datetime.datetime.combine(
+                        date, datetime.time(), datetime.timezone.utc
+                    ),
+                    is_trading_day=trading,
+                    start_time=(
+                        datetime.datetime.combine(date, start) if trading else EPOCH
+                    ),
+                    end_time=datetime.datetime.combine(date, end) if trading else EPOCH,
+                )
+            )
+            date += datetime.timedelta(days=1)
+        return SimResponse(
+            exchanges=[
+                SimTradingSchedule(exchange=name, days=days)
+                for name in exchanges
+                if not exchange or name == exchange
+            ]
+        )
+
+
+class MarketDataService(SimulatedService):
+    name = "market_data"
+
+    @rpc
+    def get_last_prices(self, *, figi: list[str] | None = None, **kwargs):
+        exchange = self.exchange
+        figis = figi or list(exchange.shares)
+        return SimResponse(
+            last_prices=[
+                SimLastPrice(
+                    figi=f,
+                    price=Price(exchange.last_price(f)).to_quotation(),
+                    time=exchange.now,
+                    instrument_uid=f,
+                )
+                for f in figis
+            ]
+        )
+
+    @rpc
+    def get_candles(
+        self,
+        *,
+        figi: str = "",
+        instrument_id: str = "",
+        from_: datetime.datetime,
+        to: datetime.datetime,
+        interval: CandleInterval,
+        **kwargs,
+    ):
+        exchange = self.exchange
+        seconds = get_interval(interval).seconds
+        times, prices = exchange.history[exchange._share(instrument_id or figi).figi]
+        start = bisect_left(times, int(from_.timestamp()))
+        stop = bisect_left(times, int(to.timestamp()))
+        buckets: dict[int, list[int]] = {}
+        for timestamp, price in zip(times[start:stop], prices[start:stop]):
+            buckets.setdefault(timestamp - timestamp % seconds, []).append(price)
+        now = int(exchange.now.timestamp())
+        return SimResponse(
+            candles=[
+                SimCandle(
+                    open=Price(bucket[0]).to_quotation(),
+                    high=Price(max(bucket)).to_quotation(),
+                    low=Price(min(bucket)).to_quotation(),
+                    close=Price(bucket[-1]).to_quotation(),
+                    volume=len(bucket),
+                    time=datetime.datetime.fromtimestamp(opened, datetime.timezone.utc),
+                    is_complete=opened + seconds <= now,
+                )
+                for opened, bucket in buckets.items()
+            ]
+        )
+
+    @rpc
+    def get_trading_status(self, *, figi: str = "", instrument_id: str = ""):
+        exchange = self.exchange
+        figi = figi or instrument_id
+        trading = exchange.is_trading(exchange._share(figi).figi)
+        return SimTradingStatus(
+            figi=figi,
+            trading_status=(
+                SecurityTradingStatus.SECURITY_TRADING_STATUS_NORMAL_TRADING
+                if trading
+                else SecurityTradingStatus.SECURITY_TRADING_STATUS_NOT_AVAILABLE_FOR_TRADING
+            ),
+            limit_order_available_flag=trading,
+            market_order_available_flag=trading,
+            instrument_uid=figi,
+        )
+
+
+def _order_state(order: SimOrder) -> SimOrderState:
+    resting = order.resting
+    executed = resting.executed
+    average = Price(resting.cost // executed if executed else 0)
+    initial = Price(order.limit or order.reserve)
+    return SimOrderState(
+        order_id=resting.order_id,
+        figi=resting.figi,
+        direction=resting.direction.to_order_direction(),
+        order_type=order.order_type,
+        execution_report_status=order.status,
+        lots_requested=order.lots,
+        lots_executed=order.lots * executed // resting.quantity,
+        initial_security_price=initial.to_money_value(),
+        average_position_price=average.to_money_value(),
+        executed_order_price=Price(resting.cost).to_money_value(),
+        total_order_amount=(initial * resting.quantity).to_money_value(),
+        order_date=order.created_at,
+        instrument_uid=resting.figi,
+        order_request_id=order.request_id,
+    )
+
+
+class OrdersService(SimulatedService):
+    name = "orders"
+
+    @rpc
+    def post_order(
+        self,
+        *,
+        figi: str = "",
+        instrument_id: str = "",
+        quantity: int = 0,
+        price: Quotation | None = None,
+        direction: OrderDirection = OrderDirection.ORDER_DIRECTION_UNSPECIFIED,
+        account_id: str = "",
+        order_type: OrderType = OrderType.ORDER_TYPE_UNSPECIFIED,
+        order_id: str = "",
+        **kwargs,
+    ):
+        self._check_account(account_id)
+        order = self.exchange.post_order(
+            figi=instrument_id or figi,
+            order_type=order_type,
+            direction=Direction.from_order_direction(direction),
+            lots=quantity,
+            price=Price.from_quotation(price) if price is not None else Price(0),
+            request_id=order_id,
+        )
+        state = _order_state(order)
+        return SimPostOrderResponse(
+            order_id=state.order_id,
+            figi=state.figi,
+            direction=state.direction,
+            order_type=state.order_type,
+            execution_report_status=state.execution_report_status,
+            lots_requested=state.lots_requested,
+            lots_executed=state.lots_executed,
+            initial_security_price=state.initial_security_price,
+            executed_order_price=state.executed_order_price,
+            total_order_amount=state.total_order_amount,
+            initial_order_price=state.total_order_amount,
+            order_request_id=order_id,
+        )
+
+    @rpc
+    def cancel_order(self, *, account_id: str = "", order_id: str = ""):
+        self._check_account(account_id)
+        self.exchange.cancel_order(order_id)
+        return SimCancelOrderResponse(time=self.exchange.now)
+
+    @rpc
+    def get_order_state(self, *, account_id: str = "", order_id: str = "", **kwargs):
+        self._check_account(account_id)
+        return _order_state(self.exchange.get_order(order_id))
+
+    @rpc
+    def get_orders(self, *, account_id: str = ""):
+        self._check_account(account_id)
+        return SimResponse(
+            orders=[_order_state(order) for order in self.exchange.active_orders()]
+        )
+
+    def _check_account(self, account_id: str) -> None:
+        if account_id != self.exchange.account.id:
+            raise ExchangeError("50004", f"Account {account_id} not found")
+
+
+class OperationsService(SimulatedService):
+    name = "operations"
+
+    @rpc
+    def get_positions(self, *, account_id: str = ""):
+        exchange = self.exchange
+        if account_id != exchange.account.id:
+            raise ExchangeError("50004", f"Account {account_id} not found")
+        securities = []
+        for figi, balance in exchange.positions.items():
+            blocked = exchange.blocked_positions.get(figi, 0)
+            if balance == 0 and blocked == 0:
+                continue
+            securities.append(
+                SimPositionsSecurities(
+                    figi=figi,
+                    balance=balance - blocked,
+                    blocked=blocked,
+                    instrument_uid=figi,
+                )
+            )
+        return SimResponse(
+            money=[Price(exchange.cash - exchange.blocked_cash).to_money_value()],
+            blocked=[Price(exchange.blocked_cash).to_money_value()],
+            securities=securities,
+        )
+
+    @rpc
+    def get_operations(
+        self,
+        *,
+        account_id: str = "",
+        from_: datetime.datetime | None = None,
+        to: datetime.datetime | None = None,
+        figi: str = "",
+        **kwargs,
+    ):
+        exchange = self.exchange
+        if account_id != exchange.account.id:
+            raise ExchangeError("50004", f"Account {account_id} not found")
+        return SimResponse(
+            operations=[
+                operation
+                for operation in exchange.operations
+                if (not figi or operation.figi == figi)
+                and (from_ is None or operation.date >= from_)
+                and (to is None or operation.date <= to)
+            ]
+        )
+
+
+class SimulatedServices:
+    """Subset of ``AsyncServices`` used by ``InvestClient``."""
+
+    def __init__(self, exchange: Exchange) -> None:
+        self.exchange = exchange
+        self.users = UsersService(exchange)
+        self.instruments = InstrumentsService(exchange)
+        self.market_data = MarketDataService(exchange)
+        self.orders = OrdersService(exchange)
+        self.operations = OperationsService(exchange)
+
+
+class SimulatedClient:
+    """Drop-in for ``tinkoff.invest.AsyncClient`` backed by a local exchange."""
+
+    def __init__(self, exchange: Exchange) -> None:
+        self.exchange = exchange
+
+    async def __aenter__(self) -> SimulatedServices:
+        return SimulatedServices(self.exchange)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        return None
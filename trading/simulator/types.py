@@ -0,0 +1,179 @@
+import datetime
+from dataclasses import dataclass, field
+
+from tinkoff.invest import (
+    AccessLevel,
+    AccountStatus,
+    AccountType,
+    MoneyValue,
+    OperationType,
+    OrderDirection,
+    OrderExecutionReportStatus,
+    OrderType,
+    Quotation,
+    SecurityTradingStatus,
+)
+
+# Response objects mirror the field names of the SDK messages we read.
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@dataclass
+class SimAccount:
+    id: str
+    name: str
+    type: AccountType = AccountType.ACCOUNT_TYPE_TINKOFF
+    status: AccountStatus = AccountStatus.ACCOUNT_STATUS_OPEN
+    access_level: AccessLevel = AccessLevel.ACCOUNT_ACCESS_LEVEL_FULL_ACCESS
+    opened_date: datetime.datetime = datetime.datetime(2020, 1, 1)
+    closed_date: datetime.datetime = datetime.datetime(1970, 1, 1)
+
+
+@dataclass
+class SimShare:
+    figi: str
+    ticker: str
+    name: str
+    lot: int
+    min_price_increment: Quotation
+    class_code: str = "TQBR"
+    uid: str = ""
+    currency: str = "rub"
+    exchange: str = "MOEX"
+    api_trade_available_flag: bool = True
+    buy_available_flag: bool = True
+    sell_available_flag: bool = True
+    short_enabled_flag: bool = False
+    trading_status: SecurityTradingStatus = (
+        SecurityTradingStatus.SECURITY_TRADING_STATUS_NORMAL_TRADING
+    )
+
+
+@dataclass
+class SimLastPrice:
+    figi: str
+    price: Quotation
+    time: datetime.datetime
+    instrument_uid: str = ""
+
+
+@dataclass
+class SimCandle:
+    open: Quotation
+    high: Quotation
+    low: Quotation
+    close: Quotation
+    volume: int
+    time: datetime.datetime
+    is_complete: bool
+
+
+@dataclass
+class SimTradingDay:
+    date: datetime.datetime
+    is_trading_day: bool
+    start_time: datetime.datetime
+    end_time: datetime.datetime
+    evening_start_time: datetime.datetime = EPOCH
+    evening_end_time: datetime.datetime = EPOCH
+    clearing_start_time: datetime.datetime = EPOCH
+    clearing_end_time: datetime.datetime = EPOCH
+
+
+@dataclass
+class SimTradingSchedule:
+    exchange: str
+    days: list[SimTradingDay]
+
+
+@dataclass
+class SimTradingStatus:
+    figi: str
+    trading_status: SecurityTradingStatus
+    limit_order_available_flag: bool
+    market_order_available_flag: bool
+    api_trade_available_flag: bool = True
+    instrument_uid: str = ""
+
+
+@dataclass
+class SimOrderState:
+    order_id: str
+    figi: str
+    direction: OrderDirection
+    order_type: OrderType
+    execution_report_status: OrderExecutionReportStatus
+    lots_requested: int
+    lots_executed: int
+    initial_security_price: MoneyValue
+    average_position_price: MoneyValue
+    executed_order_price: MoneyValue
+    total_order_amount: MoneyValue
+    order_date: datetime.datetime
+    currency: str = "rub"
+    instrument_uid: str = ""
+    order_request_id: str = ""
+
+    @property
+    def initial_order_price(self) -> MoneyValue:
+        return self.total_order_amount
+
+
+@dataclass
+class SimPostOrderResponse:
+    order_id: str
+    figi: str
+    direction: OrderDirection
+    order_type: OrderType
+    execution_report_status: OrderExecutionReportStatus
+    lots_requested: int
+    lots_executed: int
+    initial_security_price: MoneyValue
+    executed_order_price: MoneyValue
+    total_order_amount: MoneyValue
+    initial_order_price: MoneyValue
+    order_request_id: str = ""
+
+
+@dataclass
+class SimCancelOrderResponse:
+    time: datetime.datetime
+
+
+@dataclass
+class SimPositionsSecurities:
+    figi: str
+    balance: int
+    blocked: int
+    instrument_type: str = "share"
+    instrument_uid: str = ""
+
+
+@dataclass
+class SimOperation:
+    id: str
+    figi: str
+    date: datetime.datetime
+    operation_type: OperationType
+    payment: MoneyValue
+    price: MoneyValue
+    quantity: int
+    currency: str = "rub"
+    parent_operation_id: str = ""
+
+
+@dataclass
+class SimResponse:
+    """Generic response wrapper (``.accounts``, ``.instruments``, ``.orders``...)."""
+
+    accounts: list = field(default_factory=list)
+    instruments: list = field(default_factory=list)
+    last_prices: list = field(default_factory=list)
+    orders: list = field(default_factory=list)
+    operations: list = field(default_factory=list)
+    money: list = field(default_factory=list)
+    blocked: list = field(default_factory=list)
+    securities: list = field(default_factory=list)
+    candles: list = field(default_factory=list)
+    exchanges: list = field(default_factory=list)
@@ -0,0 +1,58 @@
+import asyncio
+import functools
+from collections import Counter
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers with the same key."""
+
+    def __init__(self) -> None:
+        self.calls: dict[Hashable, asyncio.Future] = {}
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+
+    async def do(self, name: str, key: Hashable, call: Callable[[], Awaitable]):
+        task = self.calls.get(key)
+        if task is None:
+            self.misses[name] += 1
+            task = asyncio.ensure_future(call())
+            self.calls[key] = task
+            task.add_done_callback(functools.partial(self._done, key))
+        else:
+            self.hits[name] += 1
+        # a cancelled caller must not cancel the call the others wait for
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every caller went away
+
+    def report(self) -> dict[str, tuple[int, int]]:
+        return {
+            name: (self.hits[name], self.misses[name])
+            for name in sorted(set(self.hits) | set(self.misses))
+        }
+
+
+flights = SingleFlight()
+
+
+def single_flight(f: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    """Deduplicate concurrent calls of a read-only ``InvestClient`` method."""
+    name = f.__name__
+
+    @functools.wraps(f)
+    async def wrapper(self, *args: Any, **kwargs: Any):
+        # per client: the shared call runs on the first caller's channel,
+        # which closes when that caller leaves its ``async with``
+        key = (name, id(self), args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return await f(self, *args, **kwargs)
+        return await flights.do(name, key, lambda: f(self, *args, **kwargs))
+
+    return wrapper
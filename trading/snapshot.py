@@ -0,0 +1,90 @@
+import asyncio
+import datetime
+import os
+import pickle
+import time
+
+from loguru import logger
+
+from config import Config
+
+from .indicators import indicators
+from .instruments import catalog
+from .reference import reference_prices
+from .schedule import calendar
+
+config = Config()  # type: ignore
+
+SNAPSHOT_VERSION = 2
+
+
+def collect() -> dict:
+    """Engine state that is slow to rebuild from the broker.
+
+    The ledger and the orders are left out, Postgres has their latest
+    state and reading it is cheap. So is the account, which is selected
+    and health-checked against the current config on every start.
+    """
+    return {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "shares": catalog.shares,
+        "calendar": (calendar.sessions, calendar.updated_on),
+        "reference_prices": dict(reference_prices.prices),
+        "indicators": (indicators.interval, dict(indicators.sets)),
+    }
+
+
+def apply(state: dict) -> None:
+    age = time.time() - state["saved_at"]
+    if state["shares"]:
+        catalog.update(state["shares"])
+        # still refreshed once its ttl has passed since the snapshot
+        catalog.updated_at = time.monotonic() - age
+    # refreshed on the first tick of a new day
+    calendar.sessions, calendar.updated_on = state["calendar"]
+    # fills since the snapshot are read from Postgres on startup
+    reference_prices.prices.update(state["reference_prices"])
+    interval, sets = state["indicators"]
+    if interval == indicators.interval:
+        # the next refresh only feeds the bars newer than the snapshot
+        indicators.sets.update(sets)
+
+
+async def save(path: str = config.SNAPSHOT_PATH) -> None:
+    data = pickle.dumps(collect(), protocol=pickle.HIGHEST_PROTOCOL)
+    await asyncio.to_thread(_write, path, data)
+    logger.debug(f"Snapshot saved to {path}: {len(data)} bytes")
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def restore(
+    path: str = config.SNAPSHOT_PATH, max_age: float = config.SNAPSHOT_MAX_AGE
+) -> bool:
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except Exception as e:
+        # e.g. written by another version of the SDK
+        logger.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return False
+    if state.get("version") != SNAPSHOT_VERSION:
+        logger.warning(f"Ignoring snapshot {path} of version {state.get('version')}")
+        return False
+    age = time.time() - state["saved_at"]
+    if age > max_age:
+        logger.info(f"Ignoring snapshot {path}, it is {age:.0f}s old")
+        return False
+    apply(state)
+    saved_at = datetime.datetime.fromtimestamp(state["saved_at"])
+    logger.info(f"Restored snapshot {path} saved at {saved_at:%Y-%m-%d %H:%M:%S}")
+    return True
@@ -1,3 +1,5 @@
+import asyncio
+
 from loguru import logger
 from requests import session
 
@@ -7,63 +9,156 @@ from .transaction import Transaction, PostOrderResponse
 from db.strategies import get_share_strategies
 from db.orders import Order, get_orders
 from db import Connection
-from aiogram import Bot
 
-from trading.orders import Quotation
+from trading.events import OrderEvent, group_by_ticker
+from trading.grid import (
+    Occupancy,
+    buy_limit,
+    free_zones,
+    get_adaptive_step,
+    get_step,
+)
+from trading.indicators import indicators
+from trading.instruments import EXCHANGES
+from trading.leader import leadership
+from trading.ledger import ledger
+from trading.reference import reference_prices
+from trading.schedule import calendar
+from trading.sharding import shard
+from trading.singleflight import flights
+from trading.tracing import traced
+from trading.orders import Direction
+from trading.price import Price
+from bus import bus
 from config import Config
+from logs import sampled
 
 config = Config()  # type: ignore
 
-bot = Bot(token=config.BOT_TOKEN)
+ORPHANS_KEY = "orphan-orders"  # the ring owner of this key reconciles them
 
 
 async def send_message(message: str):
-    for admin in config.ADMIN_IDS:
-        await bot.send_message(admin, message)
+    if not config.ADMIN_IDS:
+        return
+    # delivered to the admins by the bot process
+    try:
+        await bus.notify(message)
+    except Exception as e:
+        # a lost notification must not stop the trading
+        logger.error(f"Notification not published: {e}")
 
 
-async def on_update(order_id: str):
-    async with get_client() as client:
-        with Connection() as db:
-            order = get_orders(db, order_id=order_id)[0]
-            if not order:
-                raise ValueError(f"Order {order_id} not found")
-            share = await client.get_share_by_figi(str(order.figi))
-            if share is None:
-                raise ValueError(f"Share {order.figi} not found")
-
-            should_add_money = (
-                str(order.direction).lower() == "buy"
-                and str(order.status).lower() in ["cancelled", "rejected"]
-            ) or (
-                str(order.direction).lower() == "sell"
-                and str(order.status).lower() in ["fill"]
-            )
-            if not should_add_money:
-                return
+async def process_order_events(events: list[OrderEvent]):
+    groups = group_by_ticker(events)
+    if not groups:
+        return
+    messages: list[str] = []
+    with Connection() as db:
+        strategies = get_share_strategies(db, 1, tickers=list(groups))
+        for strategy in strategies:
+            ticker = str(strategy.ticker)
+            key = (1, ticker)
+            fills: list[OrderEvent] = []
+            rejects: list[OrderEvent] = []
+            for event in groups[ticker]:
+                if event.status == "fill":
+                    ledger.settle(key, event.direction, event.amount)
+                    # the grid is anchored to limit fills only, as on load
+                    if event.order_type == "ORDER_TYPE_LIMIT":
+                        reference_prices.update(
+                            event.figi, event.average_price or event.price
+                        )
+                    fills.append(event)
+                elif event.status in ["cancelled", "rejected"]:
+                    if event.direction == Direction.BUY:
+                        ledger.release(key, event.amount)
+                    if event.status == "rejected":
+                        rejects.append(event)
+            if fills or rejects:
+                messages.append(format_events(ticker, fills, rejects))
+        ledger.flush(db)
+    logger.debug(f"Processed {len(events)} order events for {len(groups)} tickers")
+    for message in messages:
+        await send_message(message)
 
-            extra_balance = Quotation(int(order.price_units), int(order.price_nanos)) * int(  # type: ignore
-                order.lots  # type: ignore
-            )
-            ticker = share.ticker
-            strategy = get_share_strategies(db, 1, ticker)
-            if not strategy:
-                return
-            strategy = strategy[0]
-            strategy.free_capital = float(strategy.free_capital) + extra_balance.amount  # type: ignore
-            db.commit()
-            logger.debug(f"Returned {extra_balance} to free capital")
+
+def format_events(
+    ticker: str, fills: list[OrderEvent], rejects: list[OrderEvent]
+) -> str:
+    message = f"Стратегия 1 для {ticker}:\n"
+    buys = [e for e in fills if e.direction == Direction.BUY]
+    sells = [e for e in fills if e.direction == Direction.SELL]
+    if buys:
+        message += f"\nИсполнены покупки:\n"
+        for event in buys:
+            price = event.average_price or event.price
+            message += f"Цена: {price.amount} ({event.lots} лотов)\n"
+    if sells:
+        message += f"\nИсполнены продажи:\n"
+        for event in sells:
+            price = event.average_price or event.price
+            message += f"Цена: {price.amount} ({event.lots} лотов)\n"
+    if rejects:
+        message += f"\nОтклонено заявок: {len(rejects)}\n"
+    return message
 
 
+@traced
 async def tick():
     # async with get_client() as client:
-    #     await client.update_orders(
-    #         on_cancel=on_update,
-    #         on_reject=on_update,
-    #     )
+    #     await client.update_orders(on_events=process_order_events)
     with Connection() as db:
         strategies = get_share_strategies(db, 1)
+    tickers = [str(s.ticker) for s in strategies]
+    # one engine per tick reconciles the orders no strategy covers
+    orphans = not config.LEADER_ELECTION or leadership.is_leader
+    if config.SHARDING:
+        owned = await shard.claim(tickers)
+        orphans = shard.owns(ORPHANS_KEY)
+        strategies = [s for s in strategies if str(s.ticker) in owned]
+        for strategy in strategies:
+            if str(strategy.ticker) in shard.acquired:
+                # the previous owner may have moved the capital since this
+                # worker last held the ticker, the database has it
+                ledger.load(strategy, force=True)
+    if orphans:
+        try:
+            await reconcile_orphans(tickers)
+        except Exception as e:
+            # must not keep the strategies from trading
+            logger.error(f"Reconciling orphan orders failed: {e}")
+    if not strategies:
+        return
+    if config.LEADER_ELECTION and not leadership.is_leader:
+        await warm_caches(strategies)
+        return
+    async with get_client() as client:
+        await client.update_trading_calendar()
+        shares = [
+            share
+            for strategy in strategies
+            if (share := await client.get_share_by_ticker(str(strategy.ticker)))
+            and calendar.is_open(share.exchange)
+        ]
+        # the status changes with halts and auctions, the catalog is too old
+        statuses = await asyncio.gather(
+            *(client.get_trading_status(share.figi) for share in shares),
+            return_exceptions=True,
+        )
+        tradable = set()
+        for share, status in zip(shares, statuses):
+            if isinstance(status, Exception):
+                # skipped for this tick only, the others still trade
+                logger.error(f"Trading status of {share.ticker} failed: {status}")
+            elif calendar.is_tradable(share, status):
+                tradable.add(share.ticker)
+        closed = {str(s.ticker) for s in strategies} - tradable
+    if closed:
+        logger.debug(f"Not tradable now: {', '.join(sorted(closed))}")
     for strategy in strategies:
+        if str(strategy.ticker) in closed:
+            continue
         result = await strategy1(str(strategy.ticker))
         orders: list[Order] = []
         with Connection() as db:
@@ -98,27 +193,53 @@ async def tick():
                 price = order.price_units + order.price_nanos / 1_000_000_000
                 message += f"Цена: {price} ({order.lots} лотов)\n"
         await send_message(message)
+    logger.debug(f"Single-flight hits/misses: {flights.report()}")
+
 
+async def reconcile_orphans(tickers: list[str]) -> None:
+    """Orders of tickers without a strategy, which no strategy reconciles.
+
+    Their cancellations and fills still have to reach the database.
+    """
+    async with get_client() as client:
+        await client.update_trading_calendar()
+        if not any(calendar.is_open(exchange) for exchange in EXCHANGES):
+            return  # the orders only change during the sessions
+        figis = [
+            share.figi
+            for ticker in tickers
+            if (share := await client.get_share_by_ticker(ticker)) is not None
+        ]
+        await client.update_orders(on_events=process_order_events, skip_figis=figis)
 
-def get_zone(price: Quotation, price_step: float, i: int):
-    free_coef = 0.1
-    zone_size = price * price_step
-    if i > 0:
-        zone_down = price + zone_size * (i - 1) - zone_size * free_coef + zone_size / 2
-        zone_up = price + zone_size * i + zone_size * free_coef + zone_size / 2
-    elif i < 0:
-        i = -i
-        zone_down = price - zone_size * i - zone_size * free_coef - zone_size / 2
-        zone_up = price - zone_size * (i - 1) + zone_size * free_coef - zone_size / 2
-    else:
-        return price, price
-    return zone_down, zone_up
 
+async def warm_caches(strategies: list[ShareStrategy]) -> None:
+    """What a standby engine needs ready to take over within seconds."""
+    with Connection() as db:
+        reference_prices.load(db)
+        for strategy in strategies:
+            # the leader moves the capital, the database has its latest state
+            ledger.load(strategy, force=True)
+    async with get_client() as client:
+        await client.update_trading_calendar()
+        for strategy in strategies:
+            await client.get_share_by_ticker(str(strategy.ticker))
+    logger.debug(f"Standby caches warmed for {len(strategies)} strategies")
 
+
+async def take_over() -> None:
+    with Connection() as db:
+        strategies = get_share_strategies(db, 1)
+    await warm_caches(strategies)
+
+
+@traced
 async def strategy1(ticker: str) -> list[PostOrderResponse]:
     logger.info(f"Processing strategy 1 for {ticker}")
     with Connection() as db_session:
         strategy = get_share_strategies(db_session, 1, ticker)[0]
+        key = (1, ticker)
+        ledger.load(strategy)
         transaction = Transaction(get_client())
         async with transaction:
             share = await transaction.client.get_share_by_ticker(ticker)
@@ -140,97 +261,86 @@ async def strategy1(ticker: str) -> list[PostOrderResponse]:
                 # strategy.warmed_up = True  # type: ignore
                 # db_session.commit()
             await transaction.client.update_orders(
-                on_fill=on_update,
-                on_cancel=on_update,
-                on_reject=on_update,
+                on_events=process_order_events, figis=[share.figi]
             )
 
-            last_price = await transaction.client.get_last_price(ticker=ticker)
-            last_closed = await transaction.client.get_last_closed(ticker=ticker)
-            if last_closed is not None:
-                order = await transaction.client.get_order_info(
-                    str(last_closed.order_id)
-                )
-                logger.debug(f"Last closed order: {order}")
-                avg_price = order.average_position_price
-                last_price = Quotation(avg_price.units, avg_price.nano)
-                logger.debug(f"Using last closed price: {last_price}")
+            current_price = await transaction.client.get_last_price(ticker=ticker)
+            if not reference_prices.loaded:
+                reference_prices.load(db_session)
+            last_price = reference_prices.get(share.figi)
+            if last_price is not None:
+                logger.debug("Using last closed price: {}", last_price)
             else:
-                logger.debug(f"Last price: {last_price}")
+                last_price = current_price
+                logger.debug("Last price: {}", last_price)
 
-            free_capital = float(strategy.free_capital)  # type: ignore
-            logger.debug(f"Free capital: {free_capital}")
-            zone_id = -1
-            current_price = await transaction.client.get_last_price(ticker=ticker)
-            while free_capital > 0:
-                zone_down, zone_up = get_zone(last_price, float(strategy.step_trigger) / 100, zone_id)  # type: ignore
-                logger.debug(f"Zone {zone_id}: {zone_down} - {zone_up}")
-                zone_down = Quotation(zone_down)
-                zone_up = Quotation(zone_up)
-                orders = await transaction.client.find_open_orders(
-                    ticker=ticker, from_=zone_down, to=zone_up
-                )
-                zone_id -= 1
-                if orders:
-                    logger.debug(f"Filled with orders: {len(orders)}")
-                    continue
-                new_price = Quotation(zone_down + zone_up) / 2
-                if new_price < Quotation(current_price) * 0.8:
-                    logger.info(f"Price is less than 80%: {new_price}")
+            logger.debug("Free capital: {}", ledger.free(key))
+            step = get_step(float(strategy.step_trigger))  # type: ignore
+            if bool(strategy.adaptive):
+                values = indicators.get(ticker)
+                if values is not None:
+                    step = get_adaptive_step(step, values.atr, values.close)
+                logger.debug("Adaptive step: {:.4%}", float(step))
+            max_live_orders = int(strategy.max_live_orders or 0)  # type: ignore
+            lots = int(strategy.step_amount)  # type: ignore
+            increment = Price.from_quotation(share.min_price_increment)
+            open_orders = get_orders(db_session, figi=share.figi, status="created")
+            occupancy = Occupancy(
+                Price.from_units(int(o.price_units), int(o.price_nanos)).value  # type: ignore
+                for o in open_orders
+            )
+            logger.debug("Open orders: {}", len(occupancy))
+            live_buys = sum(str(o.direction) == "BUY" for o in open_orders)
+            live_sells = len(open_orders) - live_buys
+            buys_cap = buy_limit(max_live_orders)
+            for new_price in free_zones(
+                last_price, step, current_price, Direction.BUY, occupancy
+            ):
+                if ledger.free(key).value <= 0:
                     break
-                if new_price > Quotation(current_price) * 1.2:
-                    logger.info(f"Price is more than 120%: {new_price}")
+                if max_live_orders and live_buys >= buys_cap:
+                    sampled.debug("Live buy order limit reached: {}", buys_cap)
                     break
-                amount = new_price * int(strategy.step_amount)  # type: ignore
-                if amount.amount > free_capital:  # type: ignore
+                amount = new_price * lots
+                if not ledger.reserve(key, amount):
                     break
-                logger.debug(f"Zone is empty, buying")
-                free_capital -= amount.amount
-                await transaction.limit_buy(
-                    ticker=ticker, lots=int(strategy.step_amount), price=new_price  # type: ignore
-                )
+                sampled.debug("Zone is empty, buying at {}", new_price)
+                try:
+                    await transaction.limit_buy(
+                        ticker=ticker, lots=lots, price=new_price
+                    )
+                except Exception:
+                    ledger.release(key, amount)
+                    raise
+                occupancy.add(new_price.round_to(increment))
+                live_buys += 1
 
             free_shares = await transaction.client.get_lots_amount(ticker=ticker)
-            logger.debug(f"Free shares: {free_shares}")
-            zone_id = 1
-            while free_shares >= int(strategy.step_amount):  # type: ignore
-                zone_down, zone_up = get_zone(
-                    last_price, float(strategy.step_trigger) / 100, zone_id  # type: ignore
-                )
-                zone_id += 1
-                logger.debug(f"Zone {zone_id}: {zone_down} - {zone_up}")
-                zone_down = Quotation(zone_down)
-                zone_up = Quotation(zone_up)
-                orders = await transaction.client.find_open_orders(
-                    ticker=ticker, from_=zone_down, to=zone_up
-                )
-                if orders:
-                    logger.debug(f"Filled")
-                    continue
-                logger.debug(f"Zone is empty, selling")
-                new_price = Quotation(zone_down + zone_up) / 2
-                if new_price < Quotation(current_price) * 0.8:
-                    logger.info(f"Price is less than 80%: {new_price}")
+            logger.debug("Free shares: {}", free_shares)
+            for new_price in free_zones(
+                last_price, step, current_price, Direction.SELL, occupancy
+            ):
+                if free_shares < lots:
                     break
-                if new_price > Quotation(current_price) * 1.2:
-                    logger.info(f"Price is more than 120%: {new_price}")
+                if max_live_orders and live_buys + live_sells >= max_live_orders:
+                    sampled.debug("Live order limit reached: {}", max_live_orders)
                     break
+                sampled.debug("Zone is empty, selling at {}", new_price)
+                await transaction.limit_sell(ticker=ticker, lots=lots, price=new_price)
+                occupancy.add(new_price.round_to(increment))
+                live_sells += 1
+                free_shares -= lots
 
-                await transaction.limit_sell(
-                    ticker=ticker, lots=int(strategy.step_amount), price=new_price  # type: ignore
-                )
-                free_shares -= int(strategy.step_amount)  # type: ignore
-
-            logger.debug(f"Free shares: {free_shares}")
-            logger.debug(f"Free capital: {free_capital}")
-            strategy.free_capital = free_capital  # type: ignore
-            db_session.commit()
+            logger.debug("Free shares: {}", free_shares)
+            logger.debug("Free capital: {}", ledger.free(key))
+        ledger.flush(db_session)
         if transaction.is_successful:
             return transaction.get_orders()
         else:
             return []
 
 
+@traced
 async def strategy1_warmup(transaction: Transaction, strategy: ShareStrategy):
     ticker = str(strategy.ticker)
     logger.info(f"Warming up strategy 1 for {ticker}")
@@ -265,7 +375,7 @@ async def strategy1_warmup(transaction: Transaction, strategy: ShareStrategy):
     )
     if float(free_capital) < 0:  # type: ignore
         free_capital = 0
-    strategy.free_capital = free_capital  # type: ignore
+    ledger.set((int(strategy.strategy), ticker), Price.from_float(free_capital))  # type: ignore
     logger.debug(f"Free capital: {free_capital}")
     logger.debug(f"Current balance: {await transaction.client.get_balance()}")
     logger.debug(
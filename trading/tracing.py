@@ -0,0 +1,228 @@
+import datetime
+import functools
+import inspect
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+
+config = Config()  # type: ignore
+
+KEEP_TRACES = 20  # finished root spans kept in memory
+
+
+@dataclass
+class Event:
+    """RPC or DB query issued inside a span, times in ns of ``perf_counter``."""
+
+    category: str
+    name: str
+    start: int
+    end: int
+    error: str | None = None
+
+
+@dataclass
+class Span:
+    name: str
+    args: dict[str, Any]
+    start: int
+    end: int = 0
+    children: list["Span"] = field(default_factory=list)
+    events: list[Event] = field(default_factory=list)
+    orders: list[dict[str, Any]] = field(default_factory=list)
+    error: str | None = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start) / 1e9
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def summary(self) -> str:
+        spans = list(self.walk())
+        events = [e for span in spans for e in span.events]
+        rpcs = [e for e in events if e.category == "rpc"]
+        queries = [e for e in events if e.category == "db"]
+        orders = sum(len(span.orders) for span in spans)
+        return (
+            f"{self.name} took {self.duration:.3f}s: "
+            f"{len(rpcs)} RPCs ({sum(e.end - e.start for e in rpcs) / 1e9:.3f}s), "
+            f"{len(queries)} queries ({sum(e.end - e.start for e in queries) / 1e9:.3f}s), "
+            f"{orders} orders"
+        )
+
+
+_current: ContextVar[Span | None] = ContextVar("span", default=None)
+
+
+class Tracer:
+    """Nested spans per tick, exported in the Chrome trace event format."""
+
+    def __init__(self, directory: str | None, min_duration: float = 0) -> None:
+        self.directory = directory
+        self.min_duration = min_duration
+        self.enabled = directory is not None
+        self.traces: deque[Span] = deque(maxlen=KEEP_TRACES)
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[Span | None]:
+        if not self.enabled:
+            yield None
+            return
+        parent = _current.get()
+        span = Span(name, args, time.perf_counter_ns())
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.end = time.perf_counter_ns()
+            _current.reset(token)
+            if parent is not None:
+                parent.children.append(span)
+            else:
+                self.finish(span)
+
+    def record(
+        self, category: str, name: str, duration: float, error: str | None = None
+    ) -> None:
+        span = _current.get()
+        if span is None:
+            return
+        end = time.perf_counter_ns()
+        span.events.append(Event(category, name, end - int(duration * 1e9), end, error))
+
+    def order(self, **args: Any) -> None:
+        span = _current.get()
+        if span is not None:
+            span.orders.append({"ts": time.perf_counter_ns(), **args})
+
+    def finish(self, span: Span) -> None:
+        self.traces.append(span)
+        logger.debug(span.summary())
+        if self.directory is None or span.duration < self.min_duration:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(self.directory, f"{span.name}-{stamp}.json")
+        export(path, [span])
+        logger.info(f"Trace written to {path}")
+
+
+def to_chrome(spans: list[Span], pid: int = 1) -> list[dict[str, Any]]:
+    """Trace events, loadable in chrome://tracing and ui.perfetto.dev."""
+    events: list[dict[str, Any]] = []
+    for root in spans:
+        for span in root.walk():
+            args = dict(span.args)
+            if span.error is not None:
+                args["error"] = span.error
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": "span",
+                    "ph": "X",
+                    "ts": span.start / 1000,
+                    "dur": (span.end - span.start) / 1000,
+                    "pid": pid,
+                    "tid": 1,
+                    "args": args,
+                }
+            )
+            for e in span.events:
+                events.append(
+                    {
+                        "name": e.name,
+                        "cat": e.category,
+                        "ph": "X",
+                        "ts": e.start / 1000,
+                        "dur": (e.end - e.start) / 1000,
+                        "pid": pid,
+                        "tid": 1,
+                        "args": {"error": e.error} if e.error else {},
+                    }
+                )
+            for order in span.orders:
+                args = {k: str(v) for k, v in order.items() if k != "ts"}
+                events.append(
+                    {
+                        "name": "order",
+                        "cat": "order",
+                        "ph": "i",
+                        "s": "t",
+                        "ts": order["ts"] / 1000,
+                        "pid": pid,
+                        "tid": 1,
+                        "args": args,
+                    }
+                )
+    return events
+
+
+def export(path: str, spans: list[Span]) -> None:
+    with open(path, "w") as f:
+        json.dump({"traceEvents": to_chrome(spans), "displayTimeUnit": "ms"}, f)
+
+
+tracer = Tracer(config.TRACE_DIR, config.TRACE_MIN_SECONDS)
+
+
+def traced(f: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    """Run a coroutine function inside a span named after it.
+
+    Plain str/int/float arguments are recorded as the span args.
+    """
+    signature = inspect.signature(f)
+    name = f.__qualname__
+
+    @functools.wraps(f)
+    async def wrapper(*args: Any, **kwargs: Any):
+        if not tracer.enabled:
+            return await f(*args, **kwargs)
+        bound = signature.bind_partial(*args, **kwargs).arguments
+        span_args = {k: v for k, v in bound.items() if isinstance(v, (str, int, float))}
+        with tracer.span(name, **span_args):
+            return await f(*args, **kwargs)
+
+    return wrapper
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if tracer.enabled:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not tracer.enabled or not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    tracer.record("db", " ".join(statement.split()[:4]), duration)
+
+
+@event.listens_for(Engine, "handle_error")
+def _execute_failed(context):
+    starts = context.connection.info.get("query_start") if context.connection else None
+    if not tracer.enabled or not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    statement = " ".join((context.statement or "").split()[:4])
+    tracer.record("db", statement, duration, type(context.original_exception).__name__)
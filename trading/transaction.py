@@ -1,6 +1,9 @@
 from loguru import logger
 from .client import InvestClient
-from .orders import Direction, LimitOrder, MarketOrder, Order, Quotation
+from .orders import Direction, LimitOrder, MarketOrder, Order
+from .price import Price
+from .tracing import tracer
+from logs import sampled
 from tinkoff.invest import PostOrderResponse
 
 
@@ -16,24 +19,27 @@ class Transaction:
 
     async def order(self, order: Order) -> PostOrderResponse:
         self.buffer.append(await self.client.order(order))
-        logger.debug(f"Added order to transaction buffer: {order}")
+        sampled.debug("Added order to transaction buffer: {}", order)
         return self.buffer[-1]
 
     async def cancel(self):
         logger.info("Cancelling transaction orders")
-        for order in self.buffer:
-            await self.client.cancel_order(order.order_id)
+        with tracer.span("Transaction.rollback", orders=len(self.buffer)):
+            for order in self.buffer:
+                await self.client.cancel_order(order.order_id)
 
     async def commit(self):
-        logger.debug("Committing transaction orders")
-        self.buffer.clear()
+        # the orders stay in the buffer, get_orders() is read after the block
+        sampled.debug("Committing {} transaction orders", len(self.buffer))
+        with tracer.span("Transaction.commit", orders=len(self.buffer)):
+            self.is_successful = True
 
     async def limit(
         self,
         *,
         ticker: str,
         lots: int,
-        price: Quotation | int | float,
+        price: Price | int | float,
         direction: Direction | str,
     ) -> None:
         await self.order(LimitOrder(ticker, lots, direction, price))
@@ -52,7 +58,7 @@ class Transaction:
         *,
         ticker: str,
         lots: int,
-        price: Quotation | int | float,
+        price: Price | int | float,
     ) -> None:
         await self.limit(ticker=ticker, lots=lots, price=price, direction=Direction.BUY)
 
@@ -61,7 +67,7 @@ class Transaction:
         *,
         ticker: str,
         lots: int,
-        price: Quotation | int | float,
+        price: Price | int | float,
     ) -> None:
         await self.limit(
             ticker=ticker, lots=lots, price=price, direction=Direction.SELL
@@ -93,7 +99,7 @@ class Transaction:
                 logger.error(f"Error cancelling orders: {e}")
             self.is_successful = False
         else:
-            self.is_successful = True
+            await self.commit()
         await self.client.__aexit__(exc_type, exc, tb)
 
         return True  # suppress exceptions
@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+from loguru import logger
+
+from config import Config
+
+from .metrics import LOOP_BLOCKED, LOOP_LAG
+
+config = Config()  # type: ignore
+
+STACK_DEPTH = 20  # innermost frames kept in a sample
+
+
+class LoopMonitor:
+    """Measures event loop lag and samples the stack of blocking callbacks.
+
+    A task on the loop wakes up every ``interval`` seconds and records how
+    late it was. A watchdog thread looks at the last wake-up: when the loop
+    is overdue by more than ``threshold`` the stack of the loop thread is
+    logged, which is the callback that blocks it.
+    """
+
+    def __init__(self, interval: float, threshold: float) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.heartbeat = time.monotonic()
+        self.loop_thread: int | None = None
+        self.task: asyncio.Task | None = None
+        self.stopped = threading.Event()
+
+    def start(self) -> None:
+        if self.task is not None:
+            return
+        self.loop_thread = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.stopped.clear()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+        threading.Thread(target=self.watch, name="loop-watchdog", daemon=True).start()
+        logger.info(f"Event loop monitor started, blocking threshold {self.threshold}s")
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.heartbeat = time.monotonic()
+            lag = max(self.heartbeat - started - self.interval, 0.0)
+            LOOP_LAG.observe(lag)
+            if lag >= self.threshold:
+                logger.warning(f"Event loop was blocked for {lag:.3f}s")
+
+    def watch(self) -> None:
+        reported = None
+        while not self.stopped.wait(self.threshold / 4):
+            heartbeat = self.heartbeat
+            overdue = time.monotonic() - heartbeat - self.interval
+            if overdue < self.threshold or reported == heartbeat:
+                continue
+            # one sample per stall
+            reported = heartbeat
+            LOOP_BLOCKED.inc()
+            frame = sys._current_frames().get(self.loop_thread)  # type: ignore
+            stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH))
+            logger.warning(
+                f"Event loop blocked for {overdue:.3f}s so far, in:\n{stack}"
+            )
+
+
+monitor = LoopMonitor(config.LOOP_MONITOR_INTERVAL, config.LOOP_BLOCK_THRESHOLD)